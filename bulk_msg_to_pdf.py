@@ -1,52 +1,110 @@
 """
-Convert .msg files to PDF using extract_msg + pdfkit (wkhtmltopdf).
+Convert .msg files to PDF using extract_msg + Playwright (Chromium) or wkhtmltopdf.
 
 Properly handles Outlook HTML by:
   - Extracting <style> and <body> content from the email's full HTML document
   - Replacing cid: image references with base64 data URIs
   - Building a single flat HTML document (no nested <html>/<body>)
-  - Converting via wkhtmltopdf for proper rendering
+  - Converting via one persistent headless Chromium per worker process when
+    Playwright is installed (no per-email browser startup), else wkhtmltopdf
 
   python bulk_msg_to_pdf.py
 
-Requires: pip install extract-msg pdfkit
-Requires: wkhtmltopdf installed
+Requires: pip install extract-msg
+Requires: wkhtmltopdf installed (or: pip install playwright && playwright install chromium)
 """
 import os
 import re
+import subprocess
 import sys
-import base64
+import binascii
+import concurrent.futures
+import functools
 import mimetypes
+import multiprocessing.util
 import extract_msg
-import pdfkit
 from email import policy
 from email.parser import BytesParser
+from html import escape as _html_escape
 
-# wkhtmltopdf configuration
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+# wkhtmltopdf configuration (used when Playwright is not installed or Chromium won't start)
 WKHTMLTOPDF_PATH = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
 
 INPUT_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download"
 OUTPUT_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download\PDFs"
 
-PDFKIT_OPTIONS = {
-    "encoding": "UTF-8",
-    "enable-local-file-access": "",
-    "no-stop-slow-scripts": "",
-    "quiet": "",
+# When output is redirected (stdout is block-buffered), force progress out every N files
+PROGRESS_FLUSH_EVERY = 50
+
+# Page size for both renderers (wkhtmltopdf's default), so output doesn't depend on which is installed
+PAGE_SIZE = "A4"
+
+WKHTMLTOPDF_ARGS = [
+    "--encoding", "UTF-8",
+    "--page-size", PAGE_SIZE,
+    "--enable-local-file-access",
+    "--no-stop-slow-scripts",
+    "--quiet",
+]
+
+# Chromium page options; margins match wkhtmltopdf's 10mm defaults
+PLAYWRIGHT_PDF_OPTIONS = {
+    "format": PAGE_SIZE,
+    "margin": {"top": "10mm", "right": "10mm", "bottom": "10mm", "left": "10mm"},
+    "print_background": True,
 }
 
+# Page skeleton shared by every email; filled in by build_html
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<style>
+  body {{ font-family: sans-serif; margin: 0.75in; font-size: 11pt; }}
+  .email-header {{ border-collapse: collapse; margin-bottom: 1em; width: 100%; }}
+  .email-header th {{ text-align: left; padding: 4px 10px; background: #f0f0f0;
+    border: 1px solid #ccc; width: 70px; font-size: 10pt; color: #333; }}
+  .email-header td {{ padding: 4px 10px; border: 1px solid #ccc; font-size: 10pt; }}
+  hr.divider {{ border: none; border-top: 1px solid #ccc; margin: 1em 0; }}
+  .email-body img {{ max-width: 100%; height: auto; }}
+  .email-body {{ word-wrap: break-word; overflow-wrap: break-word; }}
+</style>
+{extra_style_block}
+</head>
+<body>
+<table class="email-header">
+{rows}
+</table>
+<hr class="divider">
+<div class="email-body">
+{body_content}
+</div>
+</body>
+</html>"""
+
+# (playwright, browser, page) for this process, started on first render
+_renderer = None
+# Set once Chromium fails to start in this process, so later emails go straight to wkhtmltopdf
+_chromium_failed = False
+
+# Precompiled patterns used on every email
+_HTML_PARTS_RE = re.compile(
+    r"<style[^>]*>(?P<style>.*?)</style>|<body[^>]*>(?P<body>.*)</body>",
+    re.DOTALL | re.IGNORECASE,
+)
+_CID_SRC_RE = re.compile(r'src\s*=\s*["\']cid:([^"\']+)["\']', re.IGNORECASE)
+# Cheap probe for any cid: reference (no lowercased copy of a multi-MB body)
+_CID_PROBE_RE = re.compile(r"cid:", re.IGNORECASE)
+_DIR_AUTO_RE = re.compile(r'\bdir\s*=\s*["\']auto["\']', re.IGNORECASE)
+
 
 def html_escape(s):
-    if s is None:
-        return ""
-    s = str(s)
-    return (
-        s.replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-    )
+    return _html_escape("" if s is None else str(s), quote=True)
 
 
 def extract_body_and_styles(html):
@@ -55,27 +113,48 @@ def extract_body_and_styles(html):
     if not html or not html.strip():
         return html, ""
 
-    # Extract all <style> blocks
+    # One pass collects the <style> blocks and the inner <body> content. Styles
+    # inside the body are left in place there, where they still apply.
     styles = []
-    for m in re.finditer(r"<style[^>]*>(.*?)</style>", html, re.DOTALL | re.IGNORECASE):
-        styles.append(m.group(1).strip())
+    body_content = None
+    for m in _HTML_PARTS_RE.finditer(html):
+        if m.lastgroup == "style":
+            styles.append(m.group("style").strip())
+        elif body_content is None:
+            body_content = m.group("body").strip()
     all_css = "\n".join(styles)
 
-    # Extract inner <body> content
-    body_match = re.search(r"<body[^>]*>(.*)</body>", html, re.DOTALL | re.IGNORECASE)
-    if body_match:
-        body_content = body_match.group(1).strip()
-    else:
+    if body_content is None:
         # Not a full document; return as-is
         body_content = html
 
     return body_content, all_css
 
 
+@functools.lru_cache(maxsize=256)
+def _guess_mime(ext):
+    """MIME type for a lowercased file extension, memoized across emails."""
+    return mimetypes.guess_type("x" + ext)[0] or "application/octet-stream"
+
+
+def _apply_cid_map(html, cid_map):
+    """Replace src="cid:xxx" references with the matching data URI from cid_map."""
+    def replace_cid(match, _get=cid_map.get):
+        uri = _get(match.group(1).strip())
+        if uri is not None:
+            return f'src="{uri}"'
+        return match.group(0)
+
+    return _CID_SRC_RE.sub(replace_cid, html)
+
+
 def resolve_cid_images(html, attachments):
     """Replace cid:xxx references in HTML with base64 data URIs from attachments."""
     if not html or not attachments:
         return html
+    # No inline image references: skip reading and encoding the attachments
+    if not _CID_PROBE_RE.search(html):
+        return html
 
     # Build a map: content_id -> data URI
     cid_map = {}
@@ -98,69 +177,105 @@ def resolve_cid_images(html, attachments):
             or getattr(att, "shortFilename", None)
             or ""
         )
-        mime_type, _ = mimetypes.guess_type(filename)
-        if not mime_type:
-            mime_type = "application/octet-stream"
+        mime_type = _guess_mime(os.path.splitext(filename)[1].lower())
 
-        b64 = base64.b64encode(data).decode("ascii")
-        cid_map[cid] = f"data:{mime_type};base64,{b64}"
+        cid_map[cid] = "data:" + mime_type + ";base64," + binascii.b2a_base64(data, newline=False).decode("ascii")
 
     if not cid_map:
         return html
 
-    # Replace src="cid:xxx" with the data URI
-    def replace_cid(match):
-        ref = match.group(1).strip()
-        if ref in cid_map:
-            return f'src="{cid_map[ref]}"'
-        return match.group(0)
-
-    html = re.sub(r'src\s*=\s*["\']cid:([^"\']+)["\']', replace_cid, html, flags=re.IGNORECASE)
-    return html
+    return _apply_cid_map(html, cid_map)
 
 
 def sanitize_html(html):
     """Fix Outlook HTML quirks that break wkhtmltopdf."""
     if not html:
         return html
-    html = re.sub(r'\bdir\s*=\s*["\']auto["\']', 'dir="ltr"', html, flags=re.IGNORECASE)
+    html = _DIR_AUTO_RE.sub('dir="ltr"', html)
     html = html.replace("currentcolor", "inherit").replace("currentColor", "inherit")
     return html
 
 
+# Outlook style blocks repeat across a batch (same boilerplate per sender
+# organization), so the CSS pass is memoized; bodies are unique and are not.
+_sanitize_css = functools.lru_cache(maxsize=512)(sanitize_html)
+
+
+def _get_page():
+    """Return this process's Chromium page, launching the browser on first use.
+
+    Returns None if Chromium cannot start (e.g. `playwright install chromium` was never run).
+    """
+    global _renderer, _chromium_failed
+    if _renderer is None and not _chromium_failed:
+        pw = None
+        try:
+            pw = sync_playwright().start()
+            browser = pw.chromium.launch()
+            _renderer = (pw, browser, browser.new_page())
+        except Exception as e:
+            if pw is not None:
+                pw.stop()
+            _chromium_failed = True
+            err = str(e).strip().split("\n", 1)[0] or type(e).__name__
+            print(f"Chromium could not start, using wkhtmltopdf instead: {err}", flush=True)
+            return None
+        # Pool workers leave through os._exit, which skips atexit; multiprocessing
+        # runs its own finalizers first (and at normal exit in the main process)
+        multiprocessing.util.Finalize(None, _close_renderer, exitpriority=10)
+    return _renderer[2] if _renderer is not None else None
+
+
+def _close_renderer():
+    """Close this process's browser and Playwright, ignoring errors from a crashed browser."""
+    global _renderer
+    if _renderer is None:
+        return
+    pw, browser, _ = _renderer
+    _renderer = None
+    for close in (browser.close, pw.stop):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def render_pdf(final_html, pdf_path):
+    """Write final_html to pdf_path via the persistent Chromium page, else wkhtmltopdf."""
+    page = _get_page() if sync_playwright is not None else None
+    if page is not None:
+        try:
+            page.set_content(final_html, wait_until="load")
+            page.pdf(path=pdf_path, **PLAYWRIGHT_PDF_OPTIONS)
+            return
+        except Exception:
+            # The browser may have died (e.g. out of memory on a huge email); drop it so
+            # the next email relaunches, and render this one with wkhtmltopdf
+            _close_renderer()
+    # Feed the HTML on stdin ("-") so no temp file is written per email
+    result = subprocess.run(
+        [WKHTMLTOPDF_PATH, *WKHTMLTOPDF_ARGS, "-", pdf_path],
+        input=final_html.encode("utf-8"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        err = result.stderr.decode("utf-8", errors="replace").strip()
+        raise OSError(f"wkhtmltopdf exited with code {result.returncode}: {err}")
+
+
 def build_html(sender, to, cc, date_str, subject, body_content, extra_css):
     """Build a single flat HTML document: header table + email styles + body content."""
     extra_style_block = f"<style>\n{extra_css}\n</style>" if extra_css else ""
-    return f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<style>
-  body {{ font-family: sans-serif; margin: 0.75in; font-size: 11pt; }}
-  .email-header {{ border-collapse: collapse; margin-bottom: 1em; width: 100%; }}
-  .email-header th {{ text-align: left; padding: 4px 10px; background: #f0f0f0;
-    border: 1px solid #ccc; width: 70px; font-size: 10pt; color: #333; }}
-  .email-header td {{ padding: 4px 10px; border: 1px solid #ccc; font-size: 10pt; }}
-  hr.divider {{ border: none; border-top: 1px solid #ccc; margin: 1em 0; }}
-  .email-body img {{ max-width: 100%; height: auto; }}
-  .email-body {{ word-wrap: break-word; overflow-wrap: break-word; }}
-</style>
-{extra_style_block}
-</head>
-<body>
-<table class="email-header">
-  <tr><th>From</th><td>{html_escape(sender)}</td></tr>
-  <tr><th>To</th><td>{html_escape(to)}</td></tr>
-  <tr><th>CC</th><td>{html_escape(cc)}</td></tr>
-  <tr><th>Date</th><td>{html_escape(date_str)}</td></tr>
-  <tr><th>Subject</th><td>{html_escape(subject)}</td></tr>
-</table>
-<hr class="divider">
-<div class="email-body">
-{body_content}
-</div>
-</body>
-</html>"""
+    rows = "\n".join(
+        f"  <tr><th>{label}</th><td>{html_escape(value)}</td></tr>"
+        for label, value in (
+            ("From", sender), ("To", to), ("CC", cc), ("Date", date_str), ("Subject", subject),
+        )
+    )
+    return _HTML_TEMPLATE.format(
+        extra_style_block=extra_style_block, rows=rows, body_content=body_content
+    )
 
 
 def build_plaintext_html(sender, to, cc, date_str, subject, plain_text):
@@ -176,32 +291,35 @@ def convert_one_msg(msg_path, pdf_path):
     """Read a .msg file and convert to PDF."""
     msg = extract_msg.Message(msg_path)
     try:
+        # Read each property once; extract_msg may re-parse streams on access
         sender = msg.sender or ""
         to = getattr(msg, "to", None) or ""
         cc = getattr(msg, "cc", None) or ""
-        date_str = str(msg.date) if msg.date else ""
+        date = msg.date
+        date_str = str(date) if date else ""
         subject = msg.subject or ""
+        attachments = msg.attachments
 
         html_body = msg.htmlBody or ""
         plain_body = msg.body or ""
 
-        if html_body and hasattr(html_body, "decode"):
+        if isinstance(html_body, (bytes, bytearray)):
             html_body = html_body.decode("utf-8", errors="replace")
-        if plain_body and hasattr(plain_body, "decode"):
+        if isinstance(plain_body, (bytes, bytearray)):
             plain_body = plain_body.decode("utf-8", errors="replace")
 
         if html_body and html_body.strip():
             body_content, extra_css = extract_body_and_styles(html_body)
-            body_content = resolve_cid_images(body_content, msg.attachments)
+            body_content = resolve_cid_images(body_content, attachments)
             body_content = sanitize_html(body_content)
-            extra_css = sanitize_html(extra_css)
+            extra_css = _sanitize_css(extra_css)
             final_html = build_html(sender, to, cc, date_str, subject, body_content, extra_css)
         else:
             final_html = build_plaintext_html(sender, to, cc, date_str, subject, plain_body)
     finally:
         msg.close()
 
-    pdfkit.from_string(final_html, pdf_path, configuration=config, options=PDFKIT_OPTIONS)
+    render_pdf(final_html, pdf_path)
 
 
 def convert_one_eml(eml_path, pdf_path):
@@ -230,15 +348,18 @@ def convert_one_eml(eml_path, pdf_path):
                 raw = part.get_payload(decode=True)
                 if raw:
                     plain_body = raw.decode("utf-8", errors="replace")
-            # Collect CID images
-            cid = part.get("Content-ID", "")
-            if cid:
-                cid = cid.strip("<>").strip()
-                payload = part.get_payload(decode=True)
-                if cid and payload:
-                    mime = part.get_content_type() or "application/octet-stream"
-                    b64 = base64.b64encode(payload).decode("ascii")
-                    cid_map[cid] = f"data:{mime};base64,{b64}"
+
+        # Collect CID images only if the HTML actually references any, so
+        # unreferenced inline payloads are never decoded or base64-encoded
+        if html_body and _CID_PROBE_RE.search(html_body):
+            for part in msg.walk():
+                cid = part.get("Content-ID", "")
+                if cid:
+                    cid = cid.strip("<>").strip()
+                    payload = part.get_payload(decode=True)
+                    if cid and payload:
+                        mime = part.get_content_type() or "application/octet-stream"
+                        cid_map[cid] = "data:" + mime + ";base64," + binascii.b2a_base64(payload, newline=False).decode("ascii")
     else:
         raw = msg.get_payload(decode=True)
         if raw:
@@ -253,19 +374,22 @@ def convert_one_eml(eml_path, pdf_path):
         body_content, extra_css = extract_body_and_styles(html_body)
         # Replace CID references
         if cid_map:
-            def replace_cid(match):
-                ref = match.group(1).strip()
-                if ref in cid_map:
-                    return f'src="{cid_map[ref]}"'
-                return match.group(0)
-            body_content = re.sub(r'src\s*=\s*["\']cid:([^"\']+)["\']', replace_cid, body_content, flags=re.IGNORECASE)
+            body_content = _apply_cid_map(body_content, cid_map)
         body_content = sanitize_html(body_content)
-        extra_css = sanitize_html(extra_css)
+        extra_css = _sanitize_css(extra_css)
         final_html = build_html(sender, to, cc, date_str, subject, body_content, extra_css)
     else:
         final_html = build_plaintext_html(sender, to, cc, date_str, subject, plain_body)
 
-    pdfkit.from_string(final_html, pdf_path, configuration=config, options=PDFKIT_OPTIONS)
+    render_pdf(final_html, pdf_path)
+
+
+def _convert_dispatch(file_path, pdf_path):
+    """Pick the .msg or .eml converter by extension (top-level so it pickles)."""
+    if file_path.lower().endswith(".msg"):
+        convert_one_msg(file_path, pdf_path)
+    else:
+        convert_one_eml(file_path, pdf_path)
 
 
 def main():
@@ -278,11 +402,11 @@ def main():
 
     os.makedirs(out, exist_ok=True)
 
-    email_files = sorted(
-        f for f in os.listdir(source)
-        if (f.lower().endswith(".msg") or f.lower().endswith(".eml"))
-        and os.path.isfile(os.path.join(source, f))
-    )
+    with os.scandir(source) as it:
+        email_files = sorted(
+            e.name for e in it
+            if e.name.lower().endswith((".msg", ".eml")) and e.is_file()
+        )
     total = len(email_files)
     print(f"Found {total} .msg/.eml files in {source}", flush=True)
     print(f"Output folder: {out}\n", flush=True)
@@ -290,24 +414,42 @@ def main():
     converted = 0
     failed = 0
 
-    for i, filename in enumerate(email_files, start=1):
-        file_path = os.path.join(source, filename)
-        pdf_name = os.path.splitext(filename)[0] + ".pdf"
-        pdf_path = os.path.join(out, pdf_name)
-
-        try:
-            if filename.lower().endswith(".msg"):
-                convert_one_msg(file_path, pdf_path)
-            else:
-                convert_one_eml(file_path, pdf_path)
-            converted += 1
-            safe = filename.encode("ascii", "replace").decode("ascii")
-            print(f"Converted {i}/{total}: {safe}", flush=True)
-        except Exception as e:
-            failed += 1
+    # Each conversion is independent (own parse + own render), so fan the batch
+    # out across processes (one per core by default) and tally results as they
+    # finish. Each worker launches its own browser once and closes it when it exits.
+    with concurrent.futures.ProcessPoolExecutor() as ex:
+        futures = {}
+        # x.msg and x.eml would both map to x.pdf and be rendered at the same
+        # time, so names are made unique within the batch before submitting.
+        # Existing PDFs from earlier runs are still overwritten, as before.
+        used = set()
+        for filename in email_files:
+            file_path = os.path.join(source, filename)
+            base = os.path.splitext(filename)[0]
+            pdf_name = base + ".pdf"
+            counter = 1
+            while os.path.normcase(pdf_name) in used:
+                pdf_name = f"{base}_{counter}.pdf"
+                counter += 1
+            used.add(os.path.normcase(pdf_name))
+            pdf_path = os.path.join(out, pdf_name)
+            futures[ex.submit(_convert_dispatch, file_path, pdf_path)] = filename
+
+        for i, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            filename = futures[future]
             safe = filename.encode("ascii", "replace").decode("ascii")
-            err = str(e).encode("ascii", "replace").decode("ascii")
-            print(f"FAILED {i}/{total}: {safe} - {err}", flush=True)
+            try:
+                future.result()
+                converted += 1
+                print(f"Converted {i}/{total}: {safe}")
+            except Exception as e:
+                failed += 1
+                err = str(e).encode("ascii", "replace").decode("ascii")
+                print(f"FAILED {i}/{total}: {safe} - {err}")
+            # A console is line-buffered anyway; a redirected log gets one write
+            # per batch instead of one per file
+            if i % PROGRESS_FLUSH_EVERY == 0:
+                sys.stdout.flush()
 
     print("\n" + "=" * 60)
     print(f"Summary: {converted} converted, {failed} failed (total {total})")
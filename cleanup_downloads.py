@@ -16,6 +16,9 @@ Usage:
   python cleanup_downloads.py                    # defaults to your Downloads folder
   python cleanup_downloads.py "D:\\MyDownloads"  # custom path
   python cleanup_downloads.py --dry-run          # preview only, no changes
+
+If send2trash is installed (pip install send2trash), each step's deletions go
+to the Recycle Bin in a single batch instead of being removed one by one.
 """
 
 import os
@@ -24,15 +27,20 @@ import shutil
 import re
 from collections import defaultdict
 
+try:
+    from send2trash import send2trash
+except ImportError:
+    send2trash = None
+
 # ── Configuration ──────────────────────────────────────────────────────────────
 
 # Default Downloads path (change if needed)
 DEFAULT_DOWNLOADS = os.path.join(os.path.expanduser("~"), "Downloads")
 
-# Folders to never touch (your projects, etc.)
-PROTECTED_FOLDERS = {
+# Folders to never touch (your projects, etc.) — lowercase, matched case-insensitively
+PROTECTED_FOLDERS = frozenset({
     "extractemails.py",
-}
+})
 
 # Folder mapping by extension
 FOLDER_MAP = {
@@ -74,6 +82,9 @@ JUNK_EXTENSIONS = {".crdownload", ".tmp", ".ics", ".partial"}
 # Installer extensions (prompt before deleting)
 INSTALLER_EXTENSIONS = {".exe", ".msi", ".msix"}
 
+# Extensionless files whose names start like a GUID (leftover download blobs)
+_GUID_BLOB_RE = re.compile(r"^[0-9a-f]{8}-")
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
@@ -100,24 +111,75 @@ def get_folder_for_file(filename):
     return FOLDER_MAP.get(ext)
 
 
+def delete_paths(items):
+    """Delete (name, path) items; returns how many are gone afterwards.
+
+    Uses one send2trash call for the whole batch when available, otherwise
+    (or if the batch fails) removes the files individually.
+    """
+    if not items:
+        return 0
+    if send2trash is not None:
+        try:
+            send2trash([path for _, path in items])
+            return len(items)
+        except Exception as e:
+            safe_print(f"    Recycle Bin batch failed ({e}); deleting individually")
+    deleted = 0
+    for name, path in items:
+        if not os.path.lexists(path):
+            deleted += 1  # already handled by a partial batch
+            continue
+        try:
+            os.remove(path)
+            deleted += 1
+        except Exception as e:
+            safe_print(f"    ERROR deleting {name}: {e}")
+    return deleted
+
+
+def count_entries(path):
+    """Return (files, folders) directly inside path, in one directory scan."""
+    files = folders = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                files += 1
+            elif entry.is_dir():
+                folders += 1
+    return files, folders
+
+
+def _has_any_file(path):
+    """True as soon as any file is found under path (recursively).
+
+    Unreadable folders count as non-empty so they are never deleted blindly.
+    """
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    return True
+                if not entry.is_symlink() and _has_any_file(entry.path):
+                    return True
+    except OSError:
+        return True
+    return False
+
+
 # ── Cleanup Steps ──────────────────────────────────────────────────────────────
 
 def delete_empty_folders(downloads_path, dry_run=False):
     """Delete all empty folders (excluding protected ones)."""
     deleted = 0
-    for name in os.listdir(downloads_path):
-        path = os.path.join(downloads_path, name)
-        if not os.path.isdir(path):
-            continue
-        if name in PROTECTED_FOLDERS:
+    with os.scandir(downloads_path) as it:
+        entries = [e for e in it if e.is_dir()]
+    for entry in entries:
+        name, path = entry.name, entry.path
+        if name.lower() in PROTECTED_FOLDERS:
             continue
         # Check if truly empty (no files recursively)
-        has_files = False
-        for _, _, files in os.walk(path):
-            if files:
-                has_files = True
-                break
-        if not has_files:
+        if not _has_any_file(path):
             safe_print(f"  {'[DRY RUN] ' if dry_run else ''}Delete empty folder: {name}")
             if not dry_run:
                 try:
@@ -132,42 +194,38 @@ def delete_empty_folders(downloads_path, dry_run=False):
 
 def delete_junk_files(downloads_path, dry_run=False):
     """Delete temp files, failed downloads, calendar invites, etc."""
-    deleted = 0
-    for name in os.listdir(downloads_path):
-        path = os.path.join(downloads_path, name)
-        if not os.path.isfile(path):
-            continue
+    to_delete = []
+    with os.scandir(downloads_path) as it:
+        entries = [e for e in it if e.is_file()]
+    for entry in entries:
+        name, path = entry.name, entry.path
         ext = os.path.splitext(name)[1].lower()
         is_junk = ext in JUNK_EXTENSIONS
         is_tmp = name.startswith("~WRL") or name.startswith("~$")
         # Files with no extension and GUID-like names
-        is_blob = (not ext and re.match(r"^[0-9a-f]{8}-", name))
+        is_blob = (not ext and _GUID_BLOB_RE.match(name) is not None)
 
         if is_junk or is_tmp or is_blob:
-            size_mb = os.path.getsize(path) / (1024 * 1024)
+            size_mb = entry.stat().st_size / (1024 * 1024)
             safe_print(f"  {'[DRY RUN] ' if dry_run else ''}Delete: {name} ({size_mb:.1f} MB)")
-            if not dry_run:
-                try:
-                    os.remove(path)
-                    deleted += 1
-                except Exception as e:
-                    safe_print(f"    ERROR: {e}")
-            else:
-                deleted += 1
-    return deleted
+            to_delete.append((name, path))
+
+    if dry_run:
+        return len(to_delete)
+    return delete_paths(to_delete)
 
 
 def delete_installers(downloads_path, dry_run=False):
     """Prompt to delete installer files."""
     installers = []
-    for name in os.listdir(downloads_path):
-        path = os.path.join(downloads_path, name)
-        if not os.path.isfile(path):
-            continue
-        ext = os.path.splitext(name)[1].lower()
-        if ext in INSTALLER_EXTENSIONS:
-            size_mb = os.path.getsize(path) / (1024 * 1024)
-            installers.append((name, path, size_mb))
+    with os.scandir(downloads_path) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in INSTALLER_EXTENSIONS:
+                size_mb = entry.stat().st_size / (1024 * 1024)
+                installers.append((entry.name, entry.path, size_mb))
 
     if not installers:
         return 0
@@ -182,31 +240,24 @@ def delete_installers(downloads_path, dry_run=False):
         return len(installers)
 
     if ask_yes_no(f"\n  Delete all {len(installers)} installers?"):
-        deleted = 0
-        for name, path, _ in installers:
-            try:
-                os.remove(path)
-                deleted += 1
-            except Exception as e:
-                safe_print(f"    ERROR deleting {name}: {e}")
-        return deleted
+        return delete_paths([(name, path) for name, path, _ in installers])
     return 0
 
 
 def find_redundant_zips(downloads_path, dry_run=False):
     """Find ZIP files where an extracted folder with the same name exists."""
     redundant = []
-    for name in os.listdir(downloads_path):
-        path = os.path.join(downloads_path, name)
-        if not os.path.isfile(path):
-            continue
-        if not name.lower().endswith(".zip"):
-            continue
-        folder_name = os.path.splitext(name)[0]
-        folder_path = os.path.join(downloads_path, folder_name)
-        if os.path.isdir(folder_path):
-            size_mb = os.path.getsize(path) / (1024 * 1024)
-            redundant.append((name, path, size_mb))
+    with os.scandir(downloads_path) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            if not entry.name.lower().endswith(".zip"):
+                continue
+            folder_name = os.path.splitext(entry.name)[0]
+            folder_path = os.path.join(downloads_path, folder_name)
+            if os.path.isdir(folder_path):
+                size_mb = entry.stat().st_size / (1024 * 1024)
+                redundant.append((entry.name, entry.path, size_mb))
 
     if not redundant:
         return 0
@@ -221,14 +272,7 @@ def find_redundant_zips(downloads_path, dry_run=False):
         return len(redundant)
 
     if ask_yes_no(f"\n  Delete all {len(redundant)} redundant ZIPs?", default_yes=True):
-        deleted = 0
-        for name, path, _ in redundant:
-            try:
-                os.remove(path)
-                deleted += 1
-            except Exception as e:
-                safe_print(f"    ERROR deleting {name}: {e}")
-        return deleted
+        return delete_paths([(name, path) for name, path, _ in redundant])
     return 0
 
 
@@ -238,18 +282,19 @@ def organize_files(downloads_path, dry_run=False):
     needed_folders = set()
     files_to_move = []
 
-    for name in os.listdir(downloads_path):
-        path = os.path.join(downloads_path, name)
-        if not os.path.isfile(path):
-            continue
-        # Skip system files
-        if name.lower() in ("desktop.ini", "thumbs.db", ".ds_store"):
-            continue
+    with os.scandir(downloads_path) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            name = entry.name
+            # Skip system files
+            if name.lower() in ("desktop.ini", "thumbs.db", ".ds_store"):
+                continue
 
-        dest_folder = get_folder_for_file(name)
-        if dest_folder:
-            needed_folders.add(dest_folder)
-            files_to_move.append((name, path, dest_folder))
+            dest_folder = get_folder_for_file(name)
+            if dest_folder:
+                needed_folders.add(dest_folder)
+                files_to_move.append((name, entry.path, dest_folder))
 
     # Create folders
     for folder in sorted(needed_folders):
@@ -303,8 +348,7 @@ def main():
     print(f"{'='*60}\n")
 
     # Count initial state
-    initial_files = len([f for f in os.listdir(downloads_path) if os.path.isfile(os.path.join(downloads_path, f))])
-    initial_folders = len([f for f in os.listdir(downloads_path) if os.path.isdir(os.path.join(downloads_path, f))])
+    initial_files, initial_folders = count_entries(downloads_path)
     print(f"Current state: {initial_files} files, {initial_folders} folders at root\n")
 
     # Step 1: Empty folders
@@ -340,8 +384,7 @@ def main():
         print(f"  -> {n} files would be moved\n")
 
     # Final state
-    final_files = len([f for f in os.listdir(downloads_path) if os.path.isfile(os.path.join(downloads_path, f))])
-    final_folders = len([f for f in os.listdir(downloads_path) if os.path.isdir(os.path.join(downloads_path, f))])
+    final_files, final_folders = count_entries(downloads_path)
     print(f"{'='*60}")
     print(f"  Done! Root now has {final_files} files, {final_folders} folders")
     print(f"{'='*60}\n")
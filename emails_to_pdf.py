@@ -6,26 +6,72 @@ Run from any folder; pass a folder path as first argument (default: Extracted_Ne
   python emails_to_pdf.py "Z:\\path\\to\\folder_with_emails"
   python emails_to_pdf.py "Z:\\path\\to\\emails" "Z:\\path\\to\\pdf_output"
 
-Requires: pip install extract-msg xhtml2pdf (or pip install pdfkit for better rendering via wkhtmltopdf)
+Requires: pip install extract-msg weasyprint (or xhtml2pdf; or install wkhtmltopdf)
 """
+import io
 import os
 import re
+import shutil
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from email import policy
 from email.parser import BytesParser
 
+try:
+    from weasyprint import HTML as WeasyHTML  # optional: pip install weasyprint (much faster than xhtml2pdf)
+except (ImportError, OSError):  # OSError: installed, but its GTK/Pango libraries are missing (common on Windows)
+    WeasyHTML = None
+
 SOURCE_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download\Extracted_Nested"
 PDF_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download\Extracted_Nested\PDFs"
 
-# wkhtmltopdf path for pdfkit (better PDF rendering). Set to None to use xhtml2pdf only.
+# wkhtmltopdf path (better PDF rendering). Set to None to use WeasyPrint/xhtml2pdf only.
 WKHTMLTOPDF_PATH = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
 
+# Seconds each email may take in wkhtmltopdf before its process is killed (the rest go to the fallback)
+WKHTMLTOPDF_TIMEOUT_PER_EMAIL = 60
+
+# Characters not allowed in Windows file names, mapped to "_"
+_UNSAFE_CHARS = str.maketrans({c: "_" for c in '<>:"/\\|?*\n\r'})
+
+# Static parts of the page, encoded once; build_html only encodes the per-email middle
+_HTML_HEAD = b"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<style>
+  body { font-family: sans-serif; margin: 1in; }
+  .meta { color: #444; margin-bottom: 1em; border-bottom: 1px solid #ccc; padding-bottom: 0.5em; }
+  .meta p { margin: 0.2em 0; }
+  .body { white-space: pre-wrap; word-wrap: break-word; }
+  .body img { max-width: 100%; }
+</style>
+</head>
+<body>
+"""
+_HTML_TAIL = b"""
+</body>
+</html>"""
+
+# PDF libraries choke on the CSS currentColor keyword (case-insensitive in CSS)
+_CURRENTCOLOR_RE = re.compile("currentcolor", re.IGNORECASE)
+
+# Body counts as HTML if it opens with one of these tags (or <!DOCTYPE / <?xml / a comment),
+# after an optional byte-order mark and whitespace. The tag itself may be any length:
+# Outlook's <html xmlns:v=... xmlns:o=...> runs to ~250 characters before its ">"
+_HTML_START_RE = re.compile(
+    r"\ufeff?\s*<(?:!--|(?:!doctype|\?xml|html|head|body|div|p|span|meta|table|style|font|b|br|pre|img|center|h[1-6])(?![\w:-]))",
+    re.IGNORECASE,
+)
+
 
 def safe_filename(name, max_len=120):
     """Make a string safe for use as a filename."""
     if not name or not name.strip():
         return "email"
-    s = re.sub(r'[<>:"/\\|?*\n\r]', "_", name.strip())
+    s = name.strip().translate(_UNSAFE_CHARS)
     s = s[:max_len].strip() or "email"
     return s
 
@@ -43,36 +89,22 @@ def html_escape(s):
 
 
 def build_html(subject, from_addr, to_addr, date_str, body_html_or_plain):
-    """Build a simple HTML document for the email."""
+    """Build a simple HTML document for the email, as UTF-8 bytes."""
     body = (body_html_or_plain or "").strip() or "(no body)"
     # If it looks like HTML, embed in div (sanitize for PDF lib); else escape and use <pre>
-    if body.startswith("<") and ">" in body[:50]:
-        body = body.replace("currentcolor", "inherit").replace("currentColor", "inherit")
+    if _HTML_START_RE.match(body):
+        body = _CURRENTCOLOR_RE.sub("inherit", body.lstrip("\ufeff"))
         body_block = f'<div class="body">{body}</div>'
     else:
         body_block = f'<pre class="body">{html_escape(body)}</pre>'
-    return f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8"/>
-<style>
-  body {{ font-family: sans-serif; margin: 1in; }}
-  .meta {{ color: #444; margin-bottom: 1em; border-bottom: 1px solid #ccc; padding-bottom: 0.5em; }}
-  .meta p {{ margin: 0.2em 0; }}
-  .body {{ white-space: pre-wrap; word-wrap: break-word; }}
-  .body img {{ max-width: 100%; }}
-</style>
-</head>
-<body>
-  <div class="meta">
+    middle = f"""  <div class="meta">
     <p><b>Subject:</b> {html_escape(subject)}</p>
     <p><b>From:</b> {html_escape(from_addr)}</p>
     <p><b>To:</b> {html_escape(to_addr)}</p>
     <p><b>Date:</b> {html_escape(date_str)}</p>
   </div>
-  {body_block}
-</body>
-</html>"""
+  {body_block}"""
+    return b"".join((_HTML_HEAD, middle.encode("utf-8"), _HTML_TAIL))
 
 
 def get_email_content_msg(filepath):
@@ -80,22 +112,35 @@ def get_email_content_msg(filepath):
     import extract_msg
     msg = extract_msg.Message(filepath)
     try:
-        subject = msg.subject or ""
-        from_addr = msg.sender or ""
-        to_addr = getattr(msg, "to", None) or ""
-        date_str = str(msg.date) if msg.date else ""
-        body = msg.htmlBody or msg.body or ""
-        if body and hasattr(body, "decode"):
-            body = body.decode("utf-8", errors="replace")
-        return subject, from_addr, to_addr, date_str, body or ""
+        return msg_content(msg)
     finally:
         msg.close()
 
 
+def msg_content(msg):
+    """Get (subject, from, to, date, body) from an open extract_msg Message."""
+    subject = msg.subject or ""
+    from_addr = msg.sender or ""
+    to_addr = getattr(msg, "to", None) or ""
+    date_str = str(msg.date) if msg.date else ""
+    body = msg.htmlBody or msg.body or ""
+    if body and hasattr(body, "decode"):
+        body = body.decode("utf-8", errors="replace")
+    return subject, from_addr, to_addr, date_str, body or ""
+
+
 def get_email_content_eml(filepath):
     """Get (subject, from, to, date, body) from an .eml file."""
+    # parse(f) feeds the file to the parser in 8 KiB chunks, so the raw file is
+    # never held as one bytes object (parsebytes would need a full copy, and
+    # cannot take an mmap directly)
     with open(filepath, "rb") as f:
         msg = BytesParser(policy=policy.default).parse(f)
+    return eml_content(msg)
+
+
+def eml_content(msg):
+    """Get (subject, from, to, date, body) from a parsed email.message.EmailMessage."""
     subject = str(msg.get("subject", "") or "")
     from_addr = str(msg.get("from", "") or "")
     to_addr = str(msg.get("to", "") or "")
@@ -120,19 +165,110 @@ def get_email_content_eml(filepath):
     return subject, from_addr, to_addr, date_str, body or ""
 
 
-def html_to_pdf(html_string, pdf_path):
-    """Convert HTML string to PDF. Uses pdfkit + wkhtmltopdf if available, else xhtml2pdf."""
-    if WKHTMLTOPDF_PATH and os.path.isfile(WKHTMLTOPDF_PATH):
-        try:
-            import pdfkit
-            config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
-            pdfkit.from_string(html_string, pdf_path, configuration=config, options={"encoding": "UTF-8"})
-            return
-        except Exception:
-            pass
+def html_to_pdf(html_bytes, pdf_path):
+    """Convert UTF-8 HTML bytes (as from build_html) to PDF without wkhtmltopdf.
+
+    Uses WeasyPrint when it loads, else xhtml2pdf.
+    """
+    if WeasyHTML is not None:
+        WeasyHTML(file_obj=io.BytesIO(html_bytes), encoding="utf-8").write_pdf(pdf_path)
+        return
     from xhtml2pdf import pisa
     with open(pdf_path, "wb") as pdf_file:
-        pisa.CreatePDF(html_string.encode("utf-8"), pdf_file, encoding="utf-8")
+        pisa.CreatePDF(html_bytes, pdf_file, encoding="utf-8")
+
+
+def _wkhtmltopdf_run(pairs):
+    """Render (html_path, pdf_path) pairs with one wkhtmltopdf process. Returns an error message or None.
+
+    With --read-args-from-stdin, wkhtmltopdf runs one conversion per input line
+    and keeps its engine loaded, instead of starting up once per email. It decodes
+    those lines with the ANSI code page on Windows, so only the HTML files' ASCII
+    names are passed, relative to their folder; each PDF is rendered next to its
+    HTML and then moved to pdf_path.
+    """
+    work_dir = os.path.dirname(pairs[0][0])
+    stems = [os.path.splitext(os.path.basename(html_path))[0] for html_path, _ in pairs]
+    lines = "".join(f'--encoding UTF-8 --quiet "{stem}.html" "{stem}.pdf"\n' for stem in stems)
+    timeout = WKHTMLTOPDF_TIMEOUT_PER_EMAIL * len(pairs)
+    try:
+        result = subprocess.run(
+            [WKHTMLTOPDF_PATH, "--read-args-from-stdin"],
+            input=lines.encode("ascii"),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+            cwd=work_dir,
+        )
+    except subprocess.TimeoutExpired:
+        result = None
+    except OSError as e:
+        return f"could not start: {e}"
+    for stem, (_, pdf_path) in zip(stems, pairs):
+        rendered = os.path.join(work_dir, stem + ".pdf")
+        if os.path.isfile(rendered):
+            try:
+                os.replace(rendered, pdf_path)
+            except OSError:
+                try:
+                    shutil.move(rendered, pdf_path)  # temp folder on another drive
+                except OSError:
+                    pass  # left for render_fallback, which reports the error
+    if result is None:
+        return f"timed out after {timeout}s ({len(pairs)} file(s))"
+    if result.returncode != 0:
+        err = result.stderr.decode("utf-8", errors="replace").strip()
+        return f"exited with code {result.returncode}: {err}"
+    return None
+
+
+def wkhtmltopdf_batch(pairs):
+    """Render (html_path, pdf_path) pairs with about one wkhtmltopdf process per CPU.
+
+    The HTML files must share one folder and have ASCII names (e.g. "0.html").
+    Problems are printed; PDFs that were not produced are left for render_fallback.
+    """
+    if not pairs:
+        return
+    n = min(len(pairs), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        for err in ex.map(_wkhtmltopdf_run, [pairs[i::n] for i in range(n)]):
+            if err:
+                print(f"  wkhtmltopdf {err}".encode("ascii", "replace").decode("ascii"))
+
+
+def convert_one(job):
+    """Build the HTML for one (filepath, pdf_path, html_path) job. Returns (ok, error_message).
+
+    If html_path is set the HTML is written there for wkhtmltopdf_batch;
+    otherwise the PDF is rendered here with html_to_pdf.
+    """
+    filepath, pdf_path, html_path = job
+    try:
+        if filepath.lower().endswith(".msg"):
+            subject, from_addr, to_addr, date_str, body = get_email_content_msg(filepath)
+        else:
+            subject, from_addr, to_addr, date_str, body = get_email_content_eml(filepath)
+
+        html = build_html(subject, from_addr, to_addr, date_str, body)
+        if html_path:
+            with open(html_path, "wb") as f:
+                f.write(html)
+        else:
+            html_to_pdf(html, pdf_path)
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def render_fallback(html_path, pdf_path):
+    """Render a file wkhtmltopdf did not produce with html_to_pdf. Returns (ok, error_message)."""
+    try:
+        with open(html_path, "rb") as f:
+            html_to_pdf(f.read(), pdf_path)
+        return True, None
+    except Exception as e:
+        return False, str(e)
 
 
 def main():
@@ -150,41 +286,56 @@ def main():
     print(f"Source: {source}")
     print(f"Output: {out}\n")
 
+    # Resolve unique output names up front so parallel workers never race.
+    # One listdir replaces an exists() probe per candidate name (normcase makes
+    # the comparison case-insensitive on Windows, like the filesystem).
+    jobs = []
+    used = {os.path.normcase(name) for name in os.listdir(out)}
+    with os.scandir(source) as it:
+        entries = [e for e in it if e.name.lower().endswith((".msg", ".eml")) and e.is_file()]
+    entries.sort(key=lambda e: e.name)
+    for entry in entries:
+        filename, filepath = entry.name, entry.path
+        base = safe_filename(os.path.splitext(filename)[0])
+        pdf_name = base + ".pdf"
+        counter = 1
+        while os.path.normcase(pdf_name) in used:
+            pdf_name = f"{base}_{counter}.pdf"
+            counter += 1
+        used.add(os.path.normcase(pdf_name))
+        jobs.append((filepath, os.path.join(out, pdf_name)))
+
+    use_wkhtmltopdf = bool(WKHTMLTOPDF_PATH) and os.path.isfile(WKHTMLTOPDF_PATH)
     converted = 0
     failed = 0
 
-    for filename in sorted(os.listdir(source)):
-        lower = filename.lower()
-        if not (lower.endswith(".msg") or lower.endswith(".eml")):
-            continue
+    with tempfile.TemporaryDirectory() as html_dir:
+        jobs = [
+            (filepath, pdf_path, os.path.join(html_dir, f"{i}.html") if use_wkhtmltopdf else None)
+            for i, (filepath, pdf_path) in enumerate(jobs)
+        ]
 
-        filepath = os.path.join(source, filename)
-        if not os.path.isfile(filepath):
-            continue
+        # Files are independent, so build them across processes; results come
+        # back in order and are printed here so output never interleaves.
+        with ProcessPoolExecutor() as ex:
+            results = list(ex.map(convert_one, jobs, chunksize=4))
 
-        base = os.path.splitext(filename)[0]
-        pdf_name = safe_filename(base) + ".pdf"
-        pdf_path = os.path.join(out, pdf_name)
-        counter = 1
-        while os.path.exists(pdf_path):
-            pdf_path = os.path.join(out, f"{safe_filename(base)}_{counter}.pdf")
-            counter += 1
-
-        try:
-            if lower.endswith(".msg"):
-                subject, from_addr, to_addr, date_str, body = get_email_content_msg(filepath)
-            else:
-                subject, from_addr, to_addr, date_str, body = get_email_content_eml(filepath)
+        if use_wkhtmltopdf:
+            pending = [(html_path, pdf_path) for (_, pdf_path, html_path), (ok, _) in zip(jobs, results) if ok]
+            print(f"Rendering {len(pending)} PDF(s) with wkhtmltopdf ...\n")
+            wkhtmltopdf_batch(pending)
+            for i, ((_, pdf_path, html_path), (ok, _)) in enumerate(zip(jobs, results)):
+                if ok and not os.path.isfile(pdf_path):
+                    results[i] = render_fallback(html_path, pdf_path)
 
-            html = build_html(subject, from_addr, to_addr, date_str, body)
-            html_to_pdf(html, pdf_path)
+    for (filepath, pdf_path, _), (ok, err) in zip(jobs, results):
+        safe_print = os.path.basename(filepath).encode("ascii", "replace").decode("ascii")
+        if ok:
             converted += 1
-            safe_print = filename.encode("ascii", "replace").decode("ascii")
             print(f"  OK: {safe_print} -> {os.path.basename(pdf_path)}")
-        except Exception as e:
+        else:
             failed += 1
-            safe_print = filename.encode("ascii", "replace").decode("ascii")
-            print(f"  FAILED: {safe_print} - {e}")
+            print(f"  FAILED: {safe_print} - {err}")
 
     print("\n" + "=" * 60)
     print(f"Done. Converted {converted} to PDF. Failed: {failed}.")
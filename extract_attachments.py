@@ -18,20 +18,30 @@ non-email attachment.
 Requires: pip install extract-msg
 """
 import os
-import re
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from email import policy
 from email.parser import BytesParser
 
 SOURCE_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download"
 OUTPUT_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download\Extracted_Attachments"
 
+# Number of email files read ahead of the parser (hides network-share latency)
+PREFETCH = 8
+
+# Bytes of attachment data queued for the background writer before the parser waits for it
+MAX_PENDING_WRITE_BYTES = 16 * 1024 * 1024
+
+# Characters not allowed in Windows file names, mapped to "_"
+_UNSAFE_CHARS = str.maketrans({c: "_" for c in '<>:"/\\|?*\n\r'})
+
 
 def safe_name(name, max_len=100):
     """Make a string safe for use as a filename or folder name."""
     if not name or not str(name).strip():
         return "unnamed"
-    s = re.sub(r'[<>:"/\\|?*\n\r]', "_", str(name).strip())
+    s = str(name).strip().translate(_UNSAFE_CHARS)
     s = s[:max_len].strip() or "unnamed"
     return s
 
@@ -58,55 +68,144 @@ def get_attachment_data(attachment):
     return buf.getvalue()
 
 
-def get_attachments_msg(filepath):
-    """Get list of (filename, raw_bytes) for all attachments in a .msg file."""
+def read_file(filepath):
+    with open(filepath, "rb") as f:
+        return f.read()
+
+
+def prefetch(filepaths, depth=PREFETCH):
+    """Yield (filepath, future_of_bytes) in order, keeping `depth` reads in flight."""
+    filepaths = iter(filepaths)
+    with ThreadPoolExecutor(max_workers=depth) as ex:
+        pending = deque()
+        for filepath in filepaths:
+            pending.append((filepath, ex.submit(read_file, filepath)))
+            if len(pending) >= depth:
+                break
+        while pending:
+            filepath, future = pending.popleft()
+            nxt = next(filepaths, None)
+            if nxt is not None:
+                pending.append((nxt, ex.submit(read_file, nxt)))
+            yield filepath, future
+
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def drain_writes(pending, max_bytes=0):
+    """Wait for queued (path, future, size) writes until at most `max_bytes` remain queued.
+
+    Returns how many succeeded.
+    """
+    saved = 0
+    queued = sum(size for _, _, size in pending)
+    while pending and queued > max_bytes:
+        save_path, future, size = pending.popleft()
+        queued -= size
+        try:
+            future.result()
+            saved += 1
+        except Exception as e:
+            print(f"      -> FAILED {save_path}: {e}")
+    return saved
+
+
+def iter_attachments_msg(source, skip_nested=False):
+    """Yield (filename, raw_bytes) for each attachment in a .msg file (path or raw bytes)."""
     import extract_msg
-    msg = extract_msg.Message(filepath)
-    result = []
+    msg = extract_msg.Message(source)
     try:
-        for i, att in enumerate(msg.attachments):
-            name = (
-                getattr(att, "longFilename", None)
-                or getattr(att, "shortFilename", None)
-                or f"attachment_{i}"
-            )
-            if not name or not name.strip():
-                name = f"attachment_{i}"
-            name = safe_name(name, 200)
-            if not os.path.splitext(name)[1]:
-                name = name + ".bin"
-            try:
-                data = get_attachment_data(att)
-                if data:
-                    result.append((name, data))
-            except Exception:
-                pass
+        yield from msg_attachments(msg, skip_nested)
     finally:
         msg.close()
-    return result
 
 
-def get_attachments_eml(filepath):
-    """Get list of (filename, raw_bytes) for all attachments in an .eml file."""
-    result = []
+def msg_attachments(msg, skip_nested=False):
+    """Yield (filename, raw_bytes) for each attachment of an open extract_msg Message.
+
+    With skip_nested, .msg/.eml attachments are left out before their bytes are
+    read, so embedded messages are not exported just to be discarded.
+    """
+    for i, att in enumerate(msg.attachments):
+        name = (
+            getattr(att, "longFilename", None)
+            or getattr(att, "shortFilename", None)
+            or f"attachment_{i}"
+        )
+        if not name or not name.strip():
+            name = f"attachment_{i}"
+        name = safe_name(name, 200)
+        if not os.path.splitext(name)[1]:
+            name = name + ".bin"
+        if skip_nested and is_nested_email_attachment(name):
+            continue
+        try:
+            data = get_attachment_data(att)
+        except Exception:
+            continue
+        if data:
+            yield name, data
+
+
+def iter_attachments_eml(source, skip_nested=False):
+    """Yield (filename, raw_bytes) for each attachment in an .eml file (path or raw bytes)."""
     try:
-        with open(filepath, "rb") as f:
-            msg = BytesParser(policy=policy.default).parse(f)
-        for part in msg.walk():
-            if part.get_content_maintype() == "multipart":
-                continue
-            filename = part.get_filename()
-            if not filename:
-                continue
-            filename = safe_name(filename, 200)
-            if not os.path.splitext(filename)[1]:
-                filename = filename + ".bin"
-            payload = part.get_payload(decode=True)
-            if payload and len(payload) > 0:
-                result.append((filename, payload))
+        if isinstance(source, bytes):
+            msg = BytesParser(policy=policy.default).parsebytes(source)
+        else:
+            with open(source, "rb") as f:
+                msg = BytesParser(policy=policy.default).parse(f)
     except Exception:
-        pass
-    return result
+        return
+    yield from eml_attachments(msg, skip_nested)
+
+
+def eml_attachments(msg, skip_nested=False):
+    """Yield (filename, raw_bytes) for each attachment of a parsed email.message.EmailMessage.
+
+    skip_nested works as in msg_attachments (the payload is not decoded).
+    """
+    for part in msg.walk():
+        if part.get_content_maintype() == "multipart":
+            continue
+        filename = part.get_filename()
+        if not filename:
+            continue
+        filename = safe_name(filename, 200)
+        if not os.path.splitext(filename)[1]:
+            filename = filename + ".bin"
+        if skip_nested and is_nested_email_attachment(filename):
+            continue
+        payload = part.get_payload(decode=True)
+        if payload and len(payload) > 0:
+            yield filename, payload
+
+
+def unique_name(name, used):
+    """Return name, or name_1, name_2, ... if taken; records the result in `used` (normcased names)."""
+    save_name = name
+    n = 1
+    while os.path.normcase(save_name) in used:
+        stem, ext = os.path.splitext(name)
+        save_name = f"{stem}_{n}{ext}"
+        n += 1
+    used.add(os.path.normcase(save_name))
+    return save_name
+
+
+def email_folder_path(out_root, filename):
+    """Output subfolder for an email's attachments, named after the email file."""
+    folder_name = safe_name(os.path.splitext(filename)[0], 100)
+    email_folder = os.path.join(out_root, folder_name)
+    if os.path.exists(email_folder) and not os.path.isdir(email_folder):
+        n = 1
+        while os.path.exists(os.path.join(out_root, f"{folder_name}_{n}")):
+            n += 1
+        email_folder = os.path.join(out_root, f"{folder_name}_{n}")
+    return email_folder
 
 
 def main():
@@ -129,72 +228,78 @@ def main():
     emails_with_attachments = 0
     total_attachments = 0
 
-    for filename in sorted(os.listdir(source)):
-        lower = filename.lower()
-        if not (lower.endswith(".msg") or lower.endswith(".eml")):
-            continue
-
-        filepath = os.path.join(source, filename)
-        if not os.path.isfile(filepath):
-            continue
-
+    with os.scandir(source) as it:
+        entries = [e for e in it if e.name.lower().endswith((".msg", ".eml")) and e.is_file()]
+    entries.sort(key=lambda e: e.name)
+    filepaths = [e.path for e in entries]
+
+    # Read upcoming files in the background while the current one is parsed,
+    # and hand attachment writes to a single writer thread so disk output
+    # overlaps with parsing the next email.
+    writer = ThreadPoolExecutor(max_workers=1)
+    pending_writes = deque()
+    created_folders = set()
+    # Names taken in each output folder for the whole run. Two emails can share a
+    # folder (same stem as .msg/.eml, or names equal after truncation), and the
+    # earlier email's writes may still be queued, so the disk alone isn't enough.
+    taken = {}
+
+    for filepath, contents in prefetch(filepaths):
+        filename = os.path.basename(filepath)
+        email_folder = None
+        queued = []
         try:
-            if lower.endswith(".msg"):
-                attachments = get_attachments_msg(filepath)
+            # Nested .msg/.eml are skipped before they are read (already in Extracted_Nested)
+            if filename.lower().endswith(".msg"):
+                attachments = iter_attachments_msg(contents.result(), skip_nested=True)
             else:
-                attachments = get_attachments_eml(filepath)
+                attachments = iter_attachments_eml(contents.result(), skip_nested=True)
+
+            # Each attachment is queued for writing as soon as it is parsed, so
+            # an email's attachments are never all held in memory at once
+            for att_name, data in attachments:
+                if email_folder is None:
+                    email_folder = email_folder_path(out_root, filename)
+                    if not os.path.isdir(email_folder):
+                        os.makedirs(email_folder)
+                        created_folders.add(email_folder)
+                    used = taken.get(email_folder)
+                    if used is None:
+                        # Names already in the folder; normcase matches the filesystem's case rules
+                        used = {os.path.normcase(name) for name in os.listdir(email_folder)}
+                        taken[email_folder] = used
+
+                save_path = os.path.join(email_folder, unique_name(att_name, used))
+                pending_writes.append((save_path, writer.submit(write_file, save_path, data), len(data)))
+                queued.append(att_name)
+                total_attachments += drain_writes(pending_writes, MAX_PENDING_WRITE_BYTES)
         except Exception as e:
             print(f"  SKIP {filename}: {e}")
             continue
 
-        # Skip nested .msg/.eml (already in Extracted_Nested) to avoid duplicates
-        attachments = [(n, d) for n, d in attachments if not is_nested_email_attachment(n)]
-
         emails_processed += 1
-        if not attachments:
+        if not queued:
             continue
 
-        base = os.path.splitext(filename)[0]
-        folder_name = safe_name(base, 100)
-        email_folder = os.path.join(out_root, folder_name)
-        if os.path.exists(email_folder) and not os.path.isdir(email_folder):
-            n = 1
-            while os.path.exists(os.path.join(out_root, f"{folder_name}_{n}")):
-                n += 1
-            email_folder = os.path.join(out_root, f"{folder_name}_{n}")
-        os.makedirs(email_folder, exist_ok=True)
-
         emails_with_attachments += 1
         safe_fn = filename.encode("ascii", "replace").decode("ascii")
-        print(f"  [{safe_fn}] -> {len(attachments)} attachment(s) in folder: {os.path.basename(email_folder).encode('ascii', 'replace').decode('ascii')}")
-
-        for att_name, data in attachments:
-            save_path = os.path.join(email_folder, att_name)
-            n = 1
-            while os.path.exists(save_path):
-                stem, ext = os.path.splitext(att_name)
-                save_path = os.path.join(email_folder, f"{stem}_{n}{ext}")
-                n += 1
-            try:
-                with open(save_path, "wb") as f:
-                    f.write(data)
-                total_attachments += 1
-                safe_print = att_name.encode("ascii", "replace").decode("ascii")
-                print(f"      -> {safe_print}")
-            except Exception as e:
-                print(f"      -> FAILED {att_name}: {e}")
-
-    # Remove empty folders (e.g. from a previous run that created folders before checking)
+        print(f"  [{safe_fn}] -> {len(queued)} attachment(s) in folder: {os.path.basename(email_folder).encode('ascii', 'replace').decode('ascii')}")
+        for att_name in queued:
+            safe_print = att_name.encode("ascii", "replace").decode("ascii")
+            print(f"      -> {safe_print}")
+
+    total_attachments += drain_writes(pending_writes)
+    writer.shutdown()
+
+    # Remove folders this run created but left empty (every write failed).
+    # Leftovers from older runs can be cleaned with clean_empty_folders.py.
     removed = 0
-    for root, dirs, _ in os.walk(out_root, topdown=False):
-        for d in dirs:
-            path = os.path.join(root, d)
-            if os.path.isdir(path) and not os.listdir(path):
-                try:
-                    os.rmdir(path)
-                    removed += 1
-                except OSError:
-                    pass
+    for path in created_folders:
+        try:
+            os.rmdir(path)  # fails (and is skipped) unless empty
+            removed += 1
+        except OSError:
+            pass
     if removed:
         print(f"Removed {removed} empty folder(s).")
 
@@ -8,6 +8,7 @@ Run from any folder; uses the path below or pass a folder as first argument.
 """
 import extract_msg
 import os
+import re
 import sys
 from email import policy
 from email.parser import BytesParser
@@ -18,6 +19,16 @@ OUTPUT_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Resp
 # File extensions we treat as email (nested attachments we want to find/extract)
 EMAIL_EXTENSIONS = (".msg", ".eml")
 
+# Outlook .msg files are OLE2 compound files and start with this signature
+OLE2_MAGIC = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"
+
+# Every attachment (embedded message or attached file) is an OLE storage named
+# __attach_version1.0_#XXXXXXXX. Directory entries are stored whole in the file (UTF-16),
+# so a .msg without this name has no attachments and is skipped without an OLE parse.
+# Attachment names and MIME tags are not used as hints: they live in mini-stream
+# sectors that need not be contiguous, so a raw-byte search could miss them.
+_ATTACH_STORAGE_RE = re.compile(re.escape("__attach_version1.0_".encode("utf-16-le")), re.IGNORECASE)
+
 
 def get_attachment_filename(attachment, index):
     """Get best available filename for an attachment (extract_msg)."""
@@ -51,131 +62,177 @@ def normalize_email_filename(name, prefer_ext=".msg"):
     return name + prefer_ext
 
 
-def get_nested_from_eml(filepath):
+def iter_nested_msg(msg):
     """
-    Parse an .eml file and return list of (filename, raw_bytes) for parts that are .msg/.eml attachments.
+    Yield (filename, raw_bytes, embedded) for .msg/.eml attachments of an open extract_msg Message.
+    embedded is the already-parsed extract_msg Message for embedded OLE attachments, else None.
+    """
+    for i, attachment in enumerate(msg.attachments):
+        att_name = get_attachment_filename(attachment, i)
+        if not is_email_attachment(attachment, att_name):
+            continue
+        att_name = normalize_email_filename(att_name, ".msg")
+        data = attachment.data
+        embedded = None
+        if not isinstance(data, bytes):
+            if hasattr(data, "exportBytes"):
+                embedded = data
+                data = data.exportBytes()
+            else:
+                from email.generator import BytesGenerator
+                import io
+                buf = io.BytesIO()
+                BytesGenerator(buf, policy=policy.default).flatten(data)
+                data = buf.getvalue()
+        yield att_name, data, embedded
+
+
+def get_nested_from_msg(msg):
+    """Return list of (filename, raw_bytes) for .msg/.eml attachments of an open extract_msg Message."""
+    return [(att_name, data) for att_name, data, _ in iter_nested_msg(msg)]
+
+
+def save_one_nested(out, parent_stem, att_name, data):
+    """Save one nested email as <parent>__nested__<name> in out. Returns the saved path, or None on error."""
+    save_name = f"{parent_stem[:80]}__nested__{att_name[:80]}"
+    save_path = os.path.join(out, save_name)
+    counter = 1
+    while os.path.exists(save_path):
+        base, ext = os.path.splitext(save_name)
+        save_path = os.path.join(out, f"{base}_{counter}{ext}")
+        counter += 1
+    try:
+        with open(save_path, "wb") as f:
+            f.write(data)
+        print(f"      -> saved: {os.path.basename(save_path)}")
+        return save_path
+    except Exception as e:
+        print(f"      -> ERROR saving {att_name}: {e}")
+        return None
+
+
+def save_nested(nested, out, parent_stem):
+    """Save (filename, raw_bytes) pairs as <parent>__nested__<name> in out. Returns how many were saved."""
+    return sum(save_one_nested(out, parent_stem, att_name, data) is not None for att_name, data in nested)
+
+
+def get_nested_from_eml(source):
+    """
+    Parse an .eml (file path or raw bytes) and return list of (filename, raw_bytes) for parts that are .msg/.eml attachments.
     """
-    nested = []
     try:
-        with open(filepath, "rb") as f:
-            msg = BytesParser(policy=policy.default).parse(f)
-        for part in msg.walk():
-            if part.get_content_maintype() == "multipart":
+        if isinstance(source, bytes):
+            msg = BytesParser(policy=policy.default).parsebytes(source)
+        else:
+            # Streamed parse (8 KiB reads); see get_email_content_eml in emails_to_pdf.py
+            with open(source, "rb") as f:
+                msg = BytesParser(policy=policy.default).parse(f)
+        return get_nested_from_eml_message(msg)
+    except Exception:
+        return []
+
+
+def get_nested_from_eml_message(msg):
+    """Return list of (filename, raw_bytes) for .msg/.eml attachments of a parsed EmailMessage."""
+    nested = []
+    for part in msg.walk():
+        if part.get_content_maintype() == "multipart":
+            continue
+        filename = part.get_filename()
+        ctype = (part.get_content_type() or "").lower()
+        # attachment or inline with filename; or content type suggests email
+        is_attachment = part.get_content_disposition() in ("attachment", "inline") or filename
+        if not is_attachment and "rfc822" not in ctype and "message" not in ctype:
+            continue
+        if not filename:
+            if "rfc822" in ctype or "message" in ctype:
+                filename = f"embedded_{len(nested)}.eml"
+            elif "ms-outlook" in ctype or "vnd.ms-outlook" in ctype:
+                filename = f"embedded_{len(nested)}.msg"
+            else:
                 continue
-            filename = part.get_filename()
-            ctype = (part.get_content_type() or "").lower()
-            # attachment or inline with filename; or content type suggests email
-            is_attachment = part.get_content_disposition() in ("attachment", "inline") or filename
-            if not is_attachment and "rfc822" not in ctype and "message" not in ctype:
+        low = filename.lower()
+        if not (low.endswith(".msg") or low.endswith(".eml")):
+            if "rfc822" in ctype or (part.get_content_type() or "").startswith("message/"):
+                filename = filename + ".eml" if not low.endswith((".msg", ".eml")) else filename
+            elif "ms-outlook" in ctype or "vnd.ms-outlook" in ctype:
+                filename = filename + ".msg" if not low.endswith(".msg") else filename
+            else:
                 continue
-            if not filename:
-                if "rfc822" in ctype or "message" in ctype:
-                    filename = f"embedded_{len(nested)}.eml"
-                elif "ms-outlook" in ctype or "vnd.ms-outlook" in ctype:
-                    filename = f"embedded_{len(nested)}.msg"
-                else:
-                    continue
-            low = filename.lower()
-            if not (low.endswith(".msg") or low.endswith(".eml")):
-                if "rfc822" in ctype or (part.get_content_type() or "").startswith("message/"):
-                    filename = filename + ".eml" if not low.endswith((".msg", ".eml")) else filename
-                elif "ms-outlook" in ctype or "vnd.ms-outlook" in ctype:
-                    filename = filename + ".msg" if not low.endswith(".msg") else filename
-                else:
-                    continue
-            payload = part.get_payload(decode=True)
-            if payload is not None and len(payload) > 0:
-                nested.append((filename, payload))
-    except Exception:
-        pass
+        # Parts are kept base64/QP-encoded by the parser; only nested emails reach this decode
+        payload = part.get_payload(decode=True)
+        if payload is not None and len(payload) > 0:
+            nested.append((filename, payload))
     return nested
 
 
-def run_one_pass(source, out):
-    """Scan source folder for .msg/.eml with nested email attachments; extract to out. Returns (scanned, with_nested, extracted)."""
+def extract_recursive(nested, filename, out, parent_stem, depth, levels):
+    """
+    Save the nested emails of one parent into out, then recurse into each one straight from memory
+    (embedded .msg objects are walked while the parent is still open), so no level is re-read from disk.
+    Level n+1 goes to out/Extracted_Nested, as with the old one-pass-per-level scan.
+    levels[depth] holds [scanned, with_nested, extracted] counts for that level.
+    """
+    if not nested:
+        return
+    levels[depth][1] += 1
+    print(f"  [level {depth + 1}] {filename} -> {len(nested)} nested: {[n[0] for n in nested]}")
     os.makedirs(out, exist_ok=True)
-    scanned_count = 0
-    files_with_nested = 0
-    extracted_count = 0
-
-    for filename in sorted(os.listdir(source)):
-        lower = filename.lower()
-        if not (lower.endswith(".msg") or lower.endswith(".eml")):
+    child_out = os.path.join(out, "Extracted_Nested")
+    for att_name, data, embedded in nested:
+        save_path = save_one_nested(out, parent_stem, att_name, data)
+        if save_path is None:
             continue
+        levels[depth][2] += 1
+        if depth + 1 < len(levels):
+            child_name = os.path.basename(save_path)
+            extract_from_email(data, child_name, child_out, os.path.splitext(child_name)[0], depth + 1, levels, embedded)
 
-        scanned_count += 1
-        filepath = os.path.join(source, filename)
 
-        if lower.endswith(".msg"):
+def extract_from_email(source, filename, out, parent_stem, depth, levels, embedded=None):
+    """
+    Open one .msg/.eml (path or raw bytes; an already-open embedded Message is used as is)
+    and extract_recursive its nested emails. The same code serves the top level and every nested level.
+    """
+    levels[depth][0] += 1
+    try:
+        if embedded is not None:
+            extract_recursive(list(iter_nested_msg(embedded)), filename, out, parent_stem, depth, levels)
+        elif filename.lower().endswith(".eml"):
+            nested = [(n, d, None) for n, d in get_nested_from_eml(source)]
+            extract_recursive(nested, filename, out, parent_stem, depth, levels)
+        else:
+            if not isinstance(source, bytes):
+                with open(source, "rb") as f:
+                    source = f.read()
+            if not source.startswith(OLE2_MAGIC):
+                raise ValueError("not an OLE2 (.msg) file")
+            if not _ATTACH_STORAGE_RE.search(source):
+                return
+            msg = extract_msg.Message(source)
             try:
-                msg = extract_msg.Message(filepath)
-                nested = []
-                for i, attachment in enumerate(msg.attachments):
-                    att_name = get_attachment_filename(attachment, i)
-                    if not is_email_attachment(attachment, att_name):
-                        continue
-                    att_name = normalize_email_filename(att_name, ".msg")
-                    data = attachment.data
-                    if not isinstance(data, bytes):
-                        if hasattr(data, "exportBytes"):
-                            data = data.exportBytes()
-                        else:
-                            from email.generator import BytesGenerator
-                            import io
-                            buf = io.BytesIO()
-                            BytesGenerator(buf, policy=policy.default).flatten(data)
-                            data = buf.getvalue()
-                    nested.append((att_name, data))
-
-                if nested:
-                    files_with_nested += 1
-                    print(f"  [.msg] {filename} -> {len(nested)} nested: {[n[0] for n in nested]}")
-                    for att_name, data in nested:
-                        safe_parent = filename.replace(".msg", "")[:80]
-                        safe_att = att_name[:80]
-                        save_name = f"{safe_parent}__nested__{safe_att}"
-                        save_path = os.path.join(out, save_name)
-                        counter = 1
-                        while os.path.exists(save_path):
-                            base, ext = os.path.splitext(save_name)
-                            save_path = os.path.join(out, f"{base}_{counter}{ext}")
-                            counter += 1
-                        try:
-                            with open(save_path, "wb") as f:
-                                f.write(data)
-                            extracted_count += 1
-                            print(f"      -> saved: {os.path.basename(save_path)}")
-                        except Exception as e:
-                            print(f"      -> ERROR saving {att_name}: {e}")
-
+                extract_recursive(list(iter_nested_msg(msg)), filename, out, parent_stem, depth, levels)
+            finally:
                 msg.close()
-            except Exception as e:
-                print(f"  SKIPPED {filename}: {e}")
+    except Exception as e:
+        print(f"  SKIPPED {filename}: {e}")
 
-        else:
-            nested = get_nested_from_eml(filepath)
-            if nested:
-                files_with_nested += 1
-                print(f"  [.eml] {filename} -> {len(nested)} nested: {[n[0] for n in nested]}")
-                for att_name, data in nested:
-                    safe_parent = filename.replace(".eml", "")[:80]
-                    safe_att = att_name[:80]
-                    save_name = f"{safe_parent}__nested__{safe_att}"
-                    save_path = os.path.join(out, save_name)
-                    counter = 1
-                    while os.path.exists(save_path):
-                        base, ext = os.path.splitext(save_name)
-                        save_path = os.path.join(out, f"{base}_{counter}{ext}")
-                        counter += 1
-                    try:
-                        with open(save_path, "wb") as f:
-                            f.write(data)
-                        extracted_count += 1
-                        print(f"      -> saved: {os.path.basename(save_path)}")
-                    except Exception as e:
-                        print(f"      -> ERROR saving {att_name}: {e}")
-
-    return scanned_count, files_with_nested, extracted_count
+
+def run_one_pass(source, out, max_depth=5):
+    """
+    Scan source folder for .msg/.eml with nested email attachments and extract them (up to max_depth levels)
+    under out. Returns [scanned, with_nested, extracted] counts per level.
+    """
+    os.makedirs(out, exist_ok=True)
+    levels = [[0, 0, 0] for _ in range(max_depth)]
+
+    with os.scandir(source) as it:
+        entries = [e for e in it if e.name.lower().endswith(EMAIL_EXTENSIONS) and e.is_file()]
+    entries.sort(key=lambda e: e.name)
+    for entry in entries:
+        extract_from_email(entry.path, entry.name, out, os.path.splitext(entry.name)[0], 0, levels)
+
+    return levels
 
 
 def main():
@@ -187,30 +244,25 @@ def main():
         print(f"Source folder not found: {source}")
         return
 
-    total_scanned = 0
-    total_with_nested = 0
-    total_extracted = 0
-    level = 1
-
-    while level <= max_depth:
-        print("=" * 60)
-        print(f"Level {level}: Scanning for nested email attachments")
-        print("=" * 60)
-        print(f"Source: {source}")
-        print(f"Output: {out}\n")
-
-        scanned, with_nested, extracted = run_one_pass(source, out)
-        total_scanned += scanned
-        total_with_nested += with_nested
-        total_extracted += extracted
+    print("=" * 60)
+    print(f"Scanning for nested email attachments (up to {max_depth} levels)")
+    print("=" * 60)
+    print(f"Source: {source}")
+    print(f"Output: {out}\n")
 
-        print(f"\nLevel {level} -> Scanned {scanned}, found {with_nested} with nested, extracted {extracted}.")
+    levels = run_one_pass(source, out, max_depth)
 
-        if extracted == 0:
+    print()
+    for level, (scanned, with_nested, extracted) in enumerate(levels, 1):
+        if not scanned:
             break
-        source = out
+        print(f"Level {level} -> Scanned {scanned}, found {with_nested} with nested, extracted {extracted}.")
+        if extracted:
+            print(f"  Output: {out}")
         out = os.path.join(out, "Extracted_Nested")
-        level += 1
+    total_scanned = sum(level[0] for level in levels)
+    total_with_nested = sum(level[1] for level in levels)
+    total_extracted = sum(level[2] for level in levels)
 
     print("\n" + "=" * 60)
     print(f"Done. Total scanned: {total_scanned}. Total with nested: {total_with_nested}. Total extracted: {total_extracted}.")
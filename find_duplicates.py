@@ -6,10 +6,24 @@ Shows a report and optionally moves duplicates to a "_duplicates" folder or dele
 """
 
 import os
+import errno
 import hashlib
 import shutil
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import groupby
+
+try:
+    from blake3 import blake3  # optional: pip install blake3 (several times faster than SHA-256)
+except ImportError:
+    blake3 = None
+
+try:
+    import numpy as np  # optional: groups file sizes in C (helps on scans of 100k+ files)
+except ImportError:
+    np = None
 
 
 # ── CONFIGURE THESE ──────────────────────────────────────────────────────────
@@ -28,31 +42,87 @@ MIN_FILE_SIZE = 1
 SKIP_EXTENSIONS = set()
 # Example: SKIP_EXTENSIONS = {".lnk", ".ini", ".tmp"}
 
+# Threads hashing files in parallel (hashing releases the GIL, and reads overlap)
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
+# Files larger than this are hashed by BLAKE3 on all cores (its tree mode);
+# smaller ones use one thread each, since the pool above already runs many
+LARGE_FILE_SIZE = 16 * 1024 * 1024
+
+# Same-size files are first compared by a hash of just their first bytes;
+# only those that still match are read and hashed in full
+QUICK_HASH_BYTES = 64 * 1024
+
+# Reads kept in flight for that quick-hash pass. It is almost pure I/O, so a
+# deep queue keeps an SSD or network share busy (as an async I/O ring would)
+READ_QUEUE_DEPTH = 64
+
 # Folders to skip (exact folder names, case-insensitive)
 SKIP_FOLDERS = {"node_modules", ".git", "__pycache__", ".venv", "venv"}
 # ─────────────────────────────────────────────────────────────────────────────
 
 
-def get_file_hash(filepath, chunk_size=8192):
-    """Return SHA-256 hash of a file's contents."""
-    h = hashlib.sha256()
+def get_file_hash(filepath, size=0, chunk_size=1 << 20):
+    """Return a hash of a file's contents (BLAKE3 if installed, else SHA-256). size picks BLAKE3's thread count."""
+    if blake3 is not None and size > LARGE_FILE_SIZE:
+        h = blake3(max_threads=blake3.AUTO)
+        chunk_size = max(chunk_size, 8 << 20)  # enough per update to spread across cores
+    elif blake3 is not None:
+        h = blake3(max_threads=1)
+    else:
+        h = hashlib.sha256()
     try:
+        # Plain reads, not mmap: a read error must raise OSError (skipped below),
+        # while a file truncated or a share dropped under a mapping kills the process
         with open(filepath, "rb") as f:
+            if blake3 is None and hasattr(hashlib, "file_digest"):
+                # Python 3.11+: reads into one reused buffer and hashes without the GIL
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            # 1 MiB reads into a reused buffer keep the per-chunk Python overhead
+            # small next to OpenSSL's (SHA-NI accelerated) hashing
+            buf = memoryview(bytearray(chunk_size))
             while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
+                n = f.readinto(buf)
+                if not n:
                     break
-                h.update(chunk)
+                h.update(buf[:n])
     except (PermissionError, OSError) as e:
         print(f"  [SKIP] Cannot read: {filepath}  ({e})")
         return None
     return h.hexdigest()
 
 
+def quick_hash(filepath, size, n=QUICK_HASH_BYTES):
+    """Return SHA-256 hash of the first n bytes of a file (the whole file if it is no larger)."""
+    want = min(n, size)
+    try:
+        # One unbuffered read of exactly the bytes needed: no buffered file
+        # object and no extra read to discover EOF
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            data = os.read(fd, want)
+            while len(data) < want:  # short read (rare; e.g. some network shares)
+                more = os.read(fd, want - len(data))
+                if not more:
+                    break
+                data += more
+        finally:
+            os.close(fd)
+    except (PermissionError, OSError) as e:
+        print(f"  [SKIP] Cannot read: {filepath}  ({e})")
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
 def collect_files(folders, min_size, skip_ext, skip_folders):
-    """Walk the folders and group files by size (quick pre-filter)."""
-    size_map = defaultdict(list)  # size -> [filepath, ...]
-    file_count = 0
+    """Walk the folders and group files by size (quick pre-filter). Only sizes shared by 2+ files are kept."""
+    # Parallel path list + packed size array rather than a list per distinct
+    # size: most sizes are unique, so those one-item lists were mostly overhead
+    paths = []
+    sizes = array("Q")
+    # endswith() with a tuple checks every extension in one C call; with the
+    # default empty set the check is skipped entirely
+    skip_ext = tuple(ext.lower() for ext in skip_ext)
 
     for folder in folders:
         folder = os.path.abspath(folder)
@@ -60,46 +130,103 @@ def collect_files(folders, min_size, skip_ext, skip_folders):
             print(f"  [WARN] Folder not found, skipping: {folder}")
             continue
         print(f"  Scanning: {folder}")
-        for root, dirs, files in os.walk(folder):
-            # Skip unwanted directories
-            dirs[:] = [d for d in dirs if d.lower() not in skip_folders]
-            for fname in files:
-                fpath = os.path.join(root, fname)
-                ext = os.path.splitext(fname)[1].lower()
-                if skip_ext and ext in skip_ext:
-                    continue
+        # scandir entries carry the size from the directory listing on Windows,
+        # so there is no separate stat() per file as with os.walk + getsize
+        stack = [folder]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    entries = list(it)
+            except OSError:
+                continue  # unreadable folder (os.walk skipped these silently too)
+            for entry in entries:
                 try:
-                    fsize = os.path.getsize(fpath)
+                    if entry.is_dir(follow_symlinks=False):
+                        # Skip unwanted directories
+                        if entry.name.lower() not in skip_folders:
+                            stack.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if skip_ext and entry.name.lower().endswith(skip_ext):
+                        continue
+                    fsize = entry.stat(follow_symlinks=False).st_size
                 except OSError:
                     continue
                 if fsize < min_size:
                     continue
-                size_map[fsize].append(fpath)
-                file_count += 1
+                paths.append(entry.path)
+                sizes.append(fsize)
+
+    # Sorting indices by size puts equal sizes next to each other (stable, so
+    # each group keeps scan order)
+    size_map = {}  # size -> [filepath, ...]
+    if np is not None and len(sizes) > 1:
+        # Same grouping with the sort and run detection done by numpy
+        arr = np.frombuffer(sizes, dtype=np.uint64)
+        order = np.argsort(arr, kind="stable")
+        sorted_sizes = arr[order]
+        starts = np.flatnonzero(np.r_[True, sorted_sizes[1:] != sorted_sizes[:-1]])
+        counts = np.diff(np.r_[starts, len(arr)])
+        shared = counts > 1
+        for start, count in zip(starts[shared].tolist(), counts[shared].tolist()):
+            size_map[int(sorted_sizes[start])] = [paths[i] for i in order[start:start + count].tolist()]
+    else:
+        order = sorted(range(len(sizes)), key=sizes.__getitem__)
+        for fsize, group in groupby(order, key=sizes.__getitem__):
+            group = list(group)
+            if len(group) > 1:
+                size_map[fsize] = [paths[i] for i in group]
 
-    return size_map, file_count
+    return size_map, len(paths)
 
 
 def find_duplicates(size_map):
-    """From size-grouped files, hash only potential duplicates and return groups."""
+    """From size-grouped files, hash only potential duplicates and return groups as hash -> (size, [paths])."""
     hash_map = defaultdict(list)  # hash -> [filepath, ...]
+    hash_size = {}  # hash -> file size, known from the size grouping (no stat needed later)
     hashed = 0
     # Only hash files where 2+ share the same size
     candidates = {sz: paths for sz, paths in size_map.items() if len(paths) > 1}
     total_candidates = sum(len(p) for p in candidates.values())
 
-    print(f"\n  Hashing {total_candidates} candidate files ...")
-    for size, paths in candidates.items():
-        for fpath in paths:
-            fhash = get_file_hash(fpath)
+    all_paths = [fpath for paths in candidates.values() for fpath in paths]
+    all_sizes = [size for size, paths in candidates.items() for _ in paths]
+    # Unrelated files of equal size almost always differ in their first
+    # bytes, so most candidates are never read in full
+    print(f"\n  Quick-hashing {total_candidates} candidate files (first {QUICK_HASH_BYTES // 1024} KB) ...")
+    quick_map = defaultdict(list)  # (size, quick hash) -> [filepath, ...]
+    with ThreadPoolExecutor(max_workers=READ_QUEUE_DEPTH) as ex:
+        for fpath, size, qhash in zip(all_paths, all_sizes, ex.map(quick_hash, all_paths, all_sizes)):
+            if qhash:
+                quick_map[(size, qhash)].append(fpath)
+
+    full_paths = []
+    full_sizes = []
+    for (size, qhash), paths in quick_map.items():
+        if len(paths) < 2:
+            continue
+        if size <= QUICK_HASH_BYTES:
+            # The quick hash already covered the whole file
+            hash_map[qhash].extend(paths)
+            hash_size[qhash] = size
+            continue
+        full_paths.extend(paths)
+        full_sizes.extend([size] * len(paths))
+
+    total_full = len(full_paths)
+    print(f"  Hashing {total_full} candidate files in full ...")
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as ex:
+        for fpath, size, fhash in zip(full_paths, full_sizes, ex.map(get_file_hash, full_paths, full_sizes)):
             if fhash:
                 hash_map[fhash].append(fpath)
+                hash_size[fhash] = size
             hashed += 1
             if hashed % 200 == 0:
-                print(f"    ... hashed {hashed}/{total_candidates}")
+                print(f"    ... hashed {hashed}/{total_full}")
 
     # Keep only groups with actual duplicates
-    duplicates = {h: paths for h, paths in hash_map.items() if len(paths) > 1}
+    duplicates = {h: (hash_size[h], paths) for h, paths in hash_map.items() if len(paths) > 1}
     return duplicates
 
 
@@ -111,6 +238,16 @@ def pick_original(paths):
     return min(paths, key=lambda p: (len(p), p))
 
 
+def move_file(src, dest):
+    """Move a file: a plain rename on the same drive, copy + delete (shutil.move) across drives."""
+    try:
+        os.replace(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dest)
+
+
 def format_size(size_bytes):
     """Human-readable file size."""
     for unit in ("B", "KB", "MB", "GB"):
@@ -146,13 +283,10 @@ def main():
         return
 
     # Step 3: Report
-    dup_count = sum(len(p) - 1 for p in duplicates.values())
-    wasted = sum(
-        os.path.getsize(p) * (len(paths) - 1)
-        for paths in duplicates.values()
-        for p in paths[:1]
-        if os.path.exists(p)
-    )
+    # The file to keep in each group, chosen once for both the report and the removal
+    originals = {fhash: pick_original(paths) for fhash, (_, paths) in duplicates.items()}
+    dup_count = sum(len(paths) - 1 for _, paths in duplicates.values())
+    wasted = sum(size * (len(paths) - 1) for size, paths in duplicates.values())
 
     print(f"\n{'=' * 70}")
     print(f"  RESULTS: {len(duplicates)} groups, {dup_count} duplicate files")
@@ -160,11 +294,10 @@ def main():
     print(f"{'=' * 70}\n")
 
     group_num = 0
-    for fhash, paths in sorted(duplicates.items(), key=lambda x: -len(x[1])):
+    for fhash, (size, paths) in sorted(duplicates.items(), key=lambda x: -len(x[1][1])):
         group_num += 1
-        original = pick_original(paths)
-        size = format_size(os.path.getsize(paths[0])) if os.path.exists(paths[0]) else "?"
-        print(f"  Group {group_num} ({len(paths)} copies, {size} each):")
+        original = originals[fhash]
+        print(f"  Group {group_num} ({len(paths)} copies, {format_size(size)} each):")
         for p in paths:
             tag = " [KEEP]" if p == original else ""
             print(f"    {'>>>' if p == original else '   '} {p}{tag}")
@@ -189,24 +322,29 @@ def main():
     removed = 0
     errors = 0
 
-    for fhash, paths in duplicates.items():
-        original = pick_original(paths)
+    if DUPLICATES_FOLDER:
+        # Create the folder and read its names once; collisions are then
+        # checked in memory (normcase: case-insensitive on Windows, like the filesystem)
+        os.makedirs(DUPLICATES_FOLDER, exist_ok=True)
+        taken = {os.path.normcase(name) for name in os.listdir(DUPLICATES_FOLDER)}
+
+    for fhash, (_, paths) in duplicates.items():
+        original = originals[fhash]
         for p in paths:
             if p == original:
                 continue
             try:
                 if DUPLICATES_FOLDER:
                     # Preserve relative structure inside the duplicates folder
-                    rel = os.path.basename(p)
-                    dest = os.path.join(DUPLICATES_FOLDER, rel)
+                    name = os.path.basename(p)
                     # Handle name collisions in destination
-                    base, ext = os.path.splitext(dest)
+                    base, ext = os.path.splitext(name)
                     counter = 1
-                    while os.path.exists(dest):
-                        dest = f"{base}_{counter}{ext}"
+                    while os.path.normcase(name) in taken:
+                        name = f"{base}_{counter}{ext}"
                         counter += 1
-                    os.makedirs(DUPLICATES_FOLDER, exist_ok=True)
-                    shutil.move(p, dest)
+                    move_file(p, os.path.join(DUPLICATES_FOLDER, name))
+                    taken.add(os.path.normcase(name))
                 else:
                     os.remove(p)
                 removed += 1
@@ -1,7 +1,10 @@
 """Convert the Z Drive Storage Audit Report from Markdown to Word (.docx)."""
 
 import re
+from xml.sax.saxutils import escape as xml_escape
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
@@ -9,26 +12,49 @@ from docx.enum.table import WD_TABLE_ALIGNMENT
 INPUT  = r"c:\Users\SAguiar\Downloads\extractemails.py\Z_Drive_Storage_Audit_Report.md"
 OUTPUT = r"c:\Users\SAguiar\Downloads\Z_Drive_Storage_Audit_Report.docx"
 
-
-def set_cell_text(cell, text, bold=False, size=9):
-    cell.text = ""
-    p = cell.paragraphs[0]
-    run = p.add_run(text)
-    run.font.size = Pt(size)
-    run.bold = bold
+# One match per line classifies it; m.lastgroup names the kind of line
+LINE_RE = re.compile(
+    r"(?P<hashes>#{1,3}) (?P<heading>.*)"
+    r"|\s*(?P<hr>-{3,})\s*$"
+    r"|(?P<blank>\s*)$"
+    r"|(?P<bullet_indent>\s*)[-*]\s+(?P<bullet>.*)"
+    r"|(?P<number_indent>\s*)\d+\.\s+(?P<number>.*)"
+)
+BOLD_RE = re.compile(r"(\*\*.*?\*\*)")              # list items: bold only
+INLINE_RE = re.compile(r"(\*\*.*?\*\*|`[^`]+`)")    # paragraphs: bold and inline code
+TBLSEP_RE = re.compile(r"^\s*\|[\s\-:|]+\|\s*$")
+
+
+def make_row(values, widths, bold=False, size=9):
+    """
+    Build a table row (<w:tr> with one cell, paragraph and run per value) from one XML string.
+    One parse per row instead of a python-docx call per cell, run and font property.
+    Missing values give empty cells, extra values are dropped.
+    """
+    # Explicit bold on/off, so the table style's first-column bold does not apply
+    b = "<w:b/>" if bold else '<w:b w:val="0"/>'
+    rpr = f'<w:rPr>{b}<w:sz w:val="{size * 2}"/></w:rPr>'
+    cells = []
+    for i, width in enumerate(widths):
+        tcpr = f'<w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>' if width is not None else ""
+        if i < len(values):
+            text = xml_escape(values[i].strip())
+            cells.append(f'<w:tc>{tcpr}<w:p><w:r>{rpr}<w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>')
+        else:
+            cells.append(f"<w:tc>{tcpr}<w:p/></w:tc>")
+    return parse_xml(f'<w:tr {nsdecls("w")}>{"".join(cells)}</w:tr>')
 
 
 def add_table(doc, header_row, data_rows):
     cols = len(header_row)
-    table = doc.add_table(rows=1, cols=cols, style="Light Grid Accent 1")
+    table = doc.add_table(rows=0, cols=cols, style="Light Grid Accent 1")
     table.alignment = WD_TABLE_ALIGNMENT.LEFT
-    for i, h in enumerate(header_row):
-        set_cell_text(table.rows[0].cells[i], h.strip(), bold=True, size=9)
+    tbl = table._tbl
+    # Cell widths in twips, as table.add_row() would copy them from the grid
+    widths = [gc.w.twips if gc.w is not None else None for gc in tbl.tblGrid.gridCol_lst]
+    tbl.append(make_row(header_row, widths, bold=True))
     for row_data in data_rows:
-        cells = table.add_row().cells
-        for i, val in enumerate(row_data):
-            if i < cols:
-                set_cell_text(cells[i], val.strip(), size=9)
+        tbl.append(make_row(row_data, widths))
     doc.add_paragraph()  # spacing
 
 
@@ -43,9 +69,6 @@ def parse_table_block(lines):
 
 
 def main():
-    with open(INPUT, "r", encoding="utf-8") as f:
-        raw = f.read()
-
     doc = Document()
 
     # Default font
@@ -53,97 +76,70 @@ def main():
     style.font.name = "Calibri"
     style.font.size = Pt(11)
 
-    lines = raw.split("\n")
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-
-        # --- Tables ---
-        if "|" in line and i + 1 < len(lines) and re.match(r"^\s*\|[\s\-:|]+\|\s*$", lines[i + 1]):
-            table_lines = []
-            while i < len(lines) and "|" in lines[i]:
-                table_lines.append(lines[i])
-                i += 1
-            header, data = parse_table_block(table_lines)
-            add_table(doc, header, data)
-            continue
-
-        # --- Headings ---
-        if line.startswith("# "):
-            p = doc.add_heading(line[2:].strip(), level=0)
-            i += 1
-            continue
-        if line.startswith("## "):
-            doc.add_heading(line[3:].strip(), level=1)
-            i += 1
-            continue
-        if line.startswith("### "):
-            doc.add_heading(line[4:].strip(), level=2)
-            i += 1
-            continue
-
-        # --- Horizontal rule ---
-        if re.match(r"^-{3,}$", line.strip()):
-            doc.add_paragraph("_" * 60)
-            i += 1
-            continue
-
-        # --- Blank line ---
-        if line.strip() == "":
-            i += 1
-            continue
-
-        # --- Bullet / numbered list ---
-        bullet_match = re.match(r"^(\s*)[-*]\s+(.*)", line)
-        num_match = re.match(r"^(\s*)\d+\.\s+(.*)", line)
-        if bullet_match:
-            indent = len(bullet_match.group(1)) // 2
-            text = bullet_match.group(2)
-            p = doc.add_paragraph(style="List Bullet")
-            # Handle bold within text
-            parts = re.split(r"(\*\*.*?\*\*)", text)
-            for part in parts:
-                if part.startswith("**") and part.endswith("**"):
-                    run = p.add_run(part[2:-2])
-                    run.bold = True
-                else:
-                    p.add_run(part)
-            if indent > 0:
-                p.paragraph_format.left_indent = Inches(0.25 * indent)
-            i += 1
-            continue
-        if num_match:
-            indent = len(num_match.group(1)) // 2
-            text = num_match.group(2)
-            p = doc.add_paragraph(style="List Number")
-            parts = re.split(r"(\*\*.*?\*\*)", text)
-            for part in parts:
+    # Stream the file line by line; one line of lookahead (peek) is enough to
+    # spot a table header, whose next line is the |---| separator
+    with open(INPUT, "r", encoding="utf-8") as f:
+        lines = (raw_line.rstrip("\n") for raw_line in f)
+        peek = next(lines, None)
+        while peek is not None:
+            line, peek = peek, next(lines, None)
+
+            # --- Tables ---
+            if "|" in line and peek is not None and TBLSEP_RE.match(peek):
+                table_lines = [line]
+                while peek is not None and "|" in peek:
+                    table_lines.append(peek)
+                    peek = next(lines, None)
+                header, data = parse_table_block(table_lines)
+                add_table(doc, header, data)
+                continue
+
+            m = LINE_RE.match(line)
+            kind = m.lastgroup if m else None
+
+            # --- Headings ---
+            if kind == "heading":
+                doc.add_heading(m.group("heading").strip(), level=len(m.group("hashes")) - 1)
+                continue
+
+            # --- Horizontal rule ---
+            if kind == "hr":
+                doc.add_paragraph("_" * 60)
+                continue
+
+            # --- Blank line ---
+            if kind == "blank":
+                continue
+
+            # --- Bullet / numbered list ---
+            if kind in ("bullet", "number"):
+                indent = len(m.group(kind + "_indent")) // 2
+                p = doc.add_paragraph(style="List Bullet" if kind == "bullet" else "List Number")
+                # Handle bold within text
+                for part in BOLD_RE.split(m.group(kind)):
+                    if part.startswith("**") and part.endswith("**"):
+                        run = p.add_run(part[2:-2])
+                        run.bold = True
+                    else:
+                        p.add_run(part)
+                if indent > 0:
+                    p.paragraph_format.left_indent = Inches(0.25 * indent)
+                continue
+
+            # --- Regular paragraph ---
+            p = doc.add_paragraph()
+            # Handle bold and inline code
+            for part in INLINE_RE.split(line):
                 if part.startswith("**") and part.endswith("**"):
                     run = p.add_run(part[2:-2])
                     run.bold = True
+                elif part.startswith("`") and part.endswith("`"):
+                    run = p.add_run(part[1:-1])
+                    run.font.name = "Consolas"
+                    run.font.size = Pt(10)
+                    run.font.color.rgb = RGBColor(0x80, 0x00, 0x00)
                 else:
                     p.add_run(part)
-            if indent > 0:
-                p.paragraph_format.left_indent = Inches(0.25 * indent)
-            i += 1
-            continue
-
-        # --- Regular paragraph ---
-        p = doc.add_paragraph()
-        # Handle bold and inline code
-        parts = re.split(r"(\*\*.*?\*\*|`[^`]+`)", line)
-        for part in parts:
-            if part.startswith("**") and part.endswith("**"):
-                run = p.add_run(part[2:-2])
-                run.bold = True
-            elif part.startswith("`") and part.endswith("`"):
-                run = p.add_run(part[1:-1])
-                run.font.name = "Consolas"
-                run.font.size = Pt(10)
-                run.font.color.rgb = RGBColor(0x80, 0x00, 0x00)
-            else:
-                p.add_run(part)
-        i += 1
 
     doc.save(OUTPUT)
     print(f"Saved: {OUTPUT}")
@@ -0,0 +1,163 @@
+"""
+Process every .msg/.eml in a folder in ONE pass: each email is opened and parsed
+once, and the parsed message feeds all three outputs:
+
+  <output>/PDFs                    - email rendered to PDF (as emails_to_pdf.py)
+  <output>/Extracted_Attachments   - non-email attachments (as extract_attachments.py)
+  <output>/Extracted_Nested        - nested .msg/.eml attachments (as find_and_extract_nested_msg.py)
+
+Running the three scripts separately parses each .msg three times; this does it
+once. Only the first level of nesting is extracted; run
+find_and_extract_nested_msg.py on Extracted_Nested to unpack deeper levels.
+
+  python process_emails.py
+  python process_emails.py "Z:\\path\\to\\folder_with_emails"
+  python process_emails.py "Z:\\path\\to\\emails" "Z:\\path\\to\\output"
+
+Requires: pip install extract-msg weasyprint (or xhtml2pdf; or install wkhtmltopdf)
+"""
+import os
+import sys
+import tempfile
+from email import policy
+from email.parser import BytesParser
+
+import extract_msg
+
+from emails_to_pdf import (
+    WKHTMLTOPDF_PATH, build_html, eml_content, html_to_pdf, msg_content,
+    render_fallback, safe_filename, wkhtmltopdf_batch,
+)
+from extract_attachments import email_folder_path, eml_attachments, msg_attachments, unique_name
+from find_and_extract_nested_msg import get_nested_from_eml_message, get_nested_from_msg, save_nested
+
+SOURCE_FOLDER = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download"
+
+
+def read_email(filepath):
+    """Parse an email once. Returns (content, attachments, nested) for the three outputs."""
+    if filepath.lower().endswith(".msg"):
+        msg = extract_msg.Message(filepath)
+        try:
+            # Nested emails are left out of the attachments (they come from
+            # get_nested_from_msg), so each embedded message is exported only once
+            return msg_content(msg), list(msg_attachments(msg, skip_nested=True)), get_nested_from_msg(msg)
+        finally:
+            msg.close()
+    with open(filepath, "rb") as f:
+        msg = BytesParser(policy=policy.default).parse(f)
+    return eml_content(msg), list(eml_attachments(msg, skip_nested=True)), get_nested_from_eml_message(msg)
+
+
+def save_attachments(attachments, out_root, filename):
+    """Save (name, raw_bytes) pairs into this email's subfolder. Returns how many were saved."""
+    email_folder = email_folder_path(out_root, filename)
+    os.makedirs(email_folder, exist_ok=True)
+    used = {os.path.normcase(name) for name in os.listdir(email_folder)}
+    saved = 0
+    for att_name, data in attachments:
+        try:
+            with open(os.path.join(email_folder, unique_name(att_name, used)), "wb") as f:
+                f.write(data)
+            saved += 1
+        except Exception as e:
+            print(f"      -> FAILED {att_name}: {e}")
+    return saved
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE_FOLDER
+    out_root = sys.argv[2] if len(sys.argv) > 2 else source
+
+    if not os.path.isdir(source):
+        print(f"Source folder not found: {source}")
+        return
+
+    pdf_dir = os.path.join(out_root, "PDFs")
+    att_dir = os.path.join(out_root, "Extracted_Attachments")
+    nested_dir = os.path.join(out_root, "Extracted_Nested")
+    for d in (pdf_dir, att_dir, nested_dir):
+        os.makedirs(d, exist_ok=True)
+
+    print("=" * 60)
+    print("Processing .msg and .eml files (PDF + attachments + nested emails)")
+    print("=" * 60)
+    print(f"Source: {source}")
+    print(f"Output: {out_root}\n")
+
+    use_wkhtmltopdf = bool(WKHTMLTOPDF_PATH) and os.path.isfile(WKHTMLTOPDF_PATH)
+    used_pdf_names = {os.path.normcase(name) for name in os.listdir(pdf_dir)}
+    processed = 0
+    failed = 0
+    pdfs = 0
+    attachments_saved = 0
+    nested_saved = 0
+
+    with tempfile.TemporaryDirectory() as html_dir:
+        pending = []  # (html_path, pdf_path) for the wkhtmltopdf batch
+
+        with os.scandir(source) as it:
+            entries = [e for e in it if e.name.lower().endswith((".msg", ".eml")) and e.is_file()]
+        entries.sort(key=lambda e: e.name)
+        for entry in entries:
+            filename, filepath = entry.name, entry.path
+            safe_fn = filename.encode("ascii", "replace").decode("ascii")
+            try:
+                content, attachments, nested = read_email(filepath)
+            except Exception as e:
+                failed += 1
+                print(f"  FAILED: {safe_fn} - {e}")
+                continue
+            processed += 1
+
+            # PDF
+            base = safe_filename(os.path.splitext(filename)[0])
+            pdf_name = base + ".pdf"
+            counter = 1
+            while os.path.normcase(pdf_name) in used_pdf_names:
+                pdf_name = f"{base}_{counter}.pdf"
+                counter += 1
+            used_pdf_names.add(os.path.normcase(pdf_name))
+            pdf_path = os.path.join(pdf_dir, pdf_name)
+            html = build_html(*content)
+            if use_wkhtmltopdf:
+                html_path = os.path.join(html_dir, f"{len(pending)}.html")
+                with open(html_path, "wb") as f:
+                    f.write(html)
+                pending.append((html_path, pdf_path))
+            else:
+                try:
+                    html_to_pdf(html, pdf_path)
+                    pdfs += 1
+                except Exception as e:
+                    print(f"  PDF FAILED: {safe_fn} - {e}")
+
+            # Attachments (nested emails go to Extracted_Nested instead; read_email leaves them out)
+            if attachments:
+                attachments_saved += save_attachments(attachments, att_dir, filename)
+
+            # Nested emails
+            if nested:
+                nested_saved += save_nested(nested, nested_dir, os.path.splitext(filename)[0])
+
+            print(f"  OK: {safe_fn} ({len(attachments)} attachment(s), {len(nested)} nested)")
+
+        if pending:
+            print(f"\nRendering {len(pending)} PDF(s) with wkhtmltopdf ...")
+            wkhtmltopdf_batch(pending)
+            for html_path, pdf_path in pending:
+                ok, err = (True, None) if os.path.isfile(pdf_path) else render_fallback(html_path, pdf_path)
+                if ok:
+                    pdfs += 1
+                else:
+                    print(f"  PDF FAILED: {os.path.basename(pdf_path)} - {err}")
+
+    print("\n" + "=" * 60)
+    print(f"Done. Processed {processed} emails ({failed} failed). "
+          f"{pdfs} PDFs, {attachments_saved} attachments, {nested_saved} nested emails.")
+    print(f"Output: {out_root}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,21 @@ If a folder becomes empty after removing .bin files, the folder is removed too.
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Files deleted in parallel (each delete waits on the disk/share, not the CPU)
+DELETE_WORKERS = 8
+
+
+def remove_file(p):
+    """Delete one file. Returns True on success."""
+    try:
+        os.remove(p)
+        return True
+    except OSError as e:
+        print(f"  Skip {p}: {e}")
+        return False
+
 
 if len(sys.argv) < 2:
     path = r"Z:\z-UPS Flight 2976 Cases\Investigation\ORR\Okolona Fire\Response\EMAILS\ORIGINAL 502 Emails from Okolona Download\Extracted_Attachments"
@@ -16,26 +31,49 @@ if not os.path.isdir(path):
     print(f"Not a folder: {path}")
     sys.exit(1)
 
-removed_files = 0
-for root, _, files in os.walk(path):
-    for f in files:
-        if f.lower().endswith(".bin"):
-            p = os.path.join(root, f)
-            try:
-                os.remove(p)
-                removed_files += 1
-            except OSError as e:
-                print(f"  Skip {p}: {e}")
+# Collect every .bin path in one scandir walk (names and types come from the
+# directory listing, no stat per file), counting each folder's entries so
+# emptiness is known afterwards without listing any folder again
+bin_files = []  # (folder, file path)
+remaining = {}  # folder -> entries still in it
+parent = {}     # folder -> its parent folder
+scanned = []    # folders in scan order (a parent always before its children)
+stack = [path]
+while stack:
+    folder = stack.pop()
+    try:
+        with os.scandir(folder) as it:
+            entries = list(it)
+    except OSError:
+        continue  # unreadable folder: skipped, and never treated as empty
+    scanned.append(folder)
+    remaining[folder] = len(entries)
+    for entry in entries:
+        if entry.is_dir():
+            if not entry.is_symlink():  # like os.walk: don't descend into links
+                parent[entry.path] = folder
+                stack.append(entry.path)
+        elif entry.name.lower().endswith(".bin"):
+            bin_files.append((folder, entry.path))
+
+with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as ex:
+    results = list(ex.map(remove_file, [p for _, p in bin_files]))
+removed_files = sum(results)
+for (folder, _), ok in zip(bin_files, results):
+    if ok:
+        remaining[folder] -= 1
 
+# Children before parents, so a folder left empty by removing its subfolders
+# goes too. The top folder itself is kept.
 removed_dirs = 0
-for root, dirs, _ in os.walk(path, topdown=False):
-    for d in dirs:
-        p = os.path.join(root, d)
-        if os.path.isdir(p) and not os.listdir(p):
-            try:
-                os.rmdir(p)
-                removed_dirs += 1
-            except OSError:
-                pass
+for folder in reversed(scanned):
+    if folder == path or remaining[folder]:
+        continue
+    try:
+        os.rmdir(folder)
+        removed_dirs += 1
+        remaining[parent[folder]] -= 1
+    except OSError:
+        pass
 
 print(f"Removed {removed_files} .bin file(s) and {removed_dirs} empty folder(s) under {path}")